@@ -0,0 +1,56 @@
+"""
+Compares JSON parse throughput of the available decoding backends on recorded
+OpenWeatherMap payloads, and the cost of building WeatherData from raw bytes.
+Run from the repository root: python benchmarks/bench_json.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import weather_json
+
+PAYLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "payloads")
+REPEAT = 5
+
+
+def _decoders():
+    """
+    Returns the untyped decoders that are installed, keyed by backend name.
+    """
+    decoders = {"json": json.loads}
+    if weather_json.orjson is not None:
+        decoders["orjson"] = weather_json.orjson.loads
+    if weather_json.msgspec is not None:
+        decoders["msgspec"] = weather_json.msgspec.json.decode
+    return decoders
+
+
+def _throughput(func, raw: bytes) -> float:
+    """
+    Returns the best observed throughput of func(raw) in MB/s.
+    """
+    number = max(1, 2_000_000 // len(raw))
+    best = min(timeit.repeat(lambda: func(raw), number=number, repeat=REPEAT))
+    return len(raw) * number / best / 1e6
+
+
+def main():
+    print(f"default backend: {weather_json.BACKEND}")
+    for name in ("weather.json", "forecast.json"):
+        with open(os.path.join(PAYLOAD_DIR, name), "rb") as f:
+            raw = f.read()
+        print(f"\n{name} ({len(raw)} bytes)")
+        for backend, decode in _decoders().items():
+            print(f"  {backend:<30}{_throughput(decode, raw):>8.1f} MB/s")
+        if name == "weather.json":
+            stdlib = lambda data: weather_json.parse_current_weather(json.loads(data))
+            print(f"  {'json + parse_current_weather':<30}{_throughput(stdlib, raw):>8.1f} MB/s")
+            default = lambda data: weather_json.parse_current_weather(weather_json.loads(data))
+            print(f"  {'loads + parse_current_weather':<30}{_throughput(default, raw):>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measures memory per object for the weather data classes, compared with the
+equivalent plain (dict-backed) dataclasses they replaced.
+Run from the repository root: python benchmarks/bench_memory.py
+"""
+import os
+import sys
+import tracemalloc
+from dataclasses import make_dataclass, fields
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from weather_data import WeatherData, DailyForecast
+
+COUNT = 100_000
+DESCRIPTIONS = ["clear sky", "few clouds", "light rain", "overcast clouds", "moderate rain"]
+ICONS = ["01d", "02d", "10d", "04n", "10n"]
+
+
+def _plain_variant(cls):
+    """
+    Returns a dataclass with the same fields as `cls` but without slots or interning.
+    """
+    return make_dataclass(f"Plain{cls.__name__}", [(f.name, f.type) for f in fields(cls)])
+
+
+def _weather_kwargs(i):
+    # Build strings at runtime (as JSON decoding does) so they are distinct objects
+    return dict(
+        city=f"City{i}", country="GB", temperature=10.0 + i % 20, feels_like=9.0 + i % 20,
+        humidity=i % 100, description="".join(DESCRIPTIONS[i % 5]), icon="".join(ICONS[i % 5]),
+        wind_speed=3.5, pressure=1000 + i % 40,
+    )
+
+
+def _daily_kwargs(i):
+    return dict(
+        date=f"2024-01-{1 + i % 28:02d}", min_temp=1.0, max_temp=9.0, avg_temp=5.0,
+        description="".join(DESCRIPTIONS[i % 5]), icon="".join(ICONS[i % 5]),
+    )
+
+
+def bytes_per_object(cls, make_kwargs) -> float:
+    """
+    Returns the average memory retained per instance, including the strings it keeps alive.
+    """
+    tracemalloc.start()
+    kwargs = [make_kwargs(i) for i in range(COUNT)]
+    objects = [cls(**kw) for kw in kwargs]
+    del kwargs # Strings not kept alive by the objects (e.g. interned duplicates) are freed
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return retained / COUNT
+
+
+def main():
+    print(f"{'class':<16}{'plain':>12}{'slotted':>12}{'saved':>8}")
+    for cls, make_kwargs in ((WeatherData, _weather_kwargs), (DailyForecast, _daily_kwargs)):
+        plain = bytes_per_object(_plain_variant(cls), make_kwargs)
+        slotted = bytes_per_object(cls, make_kwargs)
+        print(f"{cls.__name__:<16}{plain:>10.0f} B{slotted:>10.0f} B{1 - slotted / plain:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Offline city index built from OpenWeatherMap's bulk city list
+(http://bulk.openweathermap.org/sample/city.list.json.gz).
+
+The index is a single binary file that is memory-mapped at startup, so lookups
+need no parsing and almost no memory:
+
+    header   magic (8 bytes), record count (u32)
+    records  fixed-size, sorted by normalized name:
+             key offset (u32), key length (u16), name offset (u32), name length (u16),
+             country (2 bytes), city ID (u32), latitude (f32), longitude (f32)
+    strings  UTF-8 normalized keys and display names referenced by the records
+
+Build it with:
+    python city_index.py city.list.json.gz cities.idx
+"""
+import difflib
+import gzip
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+from typing import List, Iterator
+import weather_json
+from weather_geocode import Location, normalize_city_name
+
+try:
+    import numpy as np # Optional: vectorizes the nearby-city scan
+except ImportError:
+    np = None
+
+MAGIC = b"OWMCIDX1"
+_HEADER = struct.Struct("<8sI")
+_RECORD = struct.Struct("<IHIH2sIff")
+EARTH_RADIUS_KM = 6371.0
+
+
+def index_key(name: str) -> str:
+    """
+    Returns the search key for a city name: normalized and with accents removed,
+    so "Zürich" and "zurich" match.
+    """
+    decomposed = unicodedata.normalize("NFKD", normalize_city_name(name))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def build_city_index(source_path: str, index_path: str) -> int:
+    """
+    Converts an OpenWeatherMap city list (JSON, optionally gzipped) into a binary index.
+    Args:
+        source_path (str): Path to city.list.json or city.list.json.gz.
+        index_path (str): Where to write the index. Written atomically.
+    Returns:
+        int: The number of cities indexed.
+    """
+    opener = gzip.open if source_path.endswith(".gz") else open
+    with opener(source_path, "rb") as f:
+        cities = weather_json.loads(f.read())
+
+    entries = []
+    for city in cities:
+        try:
+            entries.append((
+                index_key(city['name']).encode("utf-8"),
+                city['name'].encode("utf-8"),
+                (city.get('country') or "").encode("ascii", "replace")[:2].ljust(2),
+                city['id'],
+                city['coord']['lat'],
+                city['coord']['lon'],
+            ))
+        except (KeyError, TypeError):
+            continue # Skip malformed entries rather than failing the whole build
+    entries.sort(key=lambda entry: entry[0])
+
+    strings = bytearray()
+    records = bytearray()
+    strings_start = _HEADER.size + _RECORD.size * len(entries)
+    for key, name, country, city_id, lat, lon in entries:
+        key_offset = strings_start + len(strings)
+        strings += key
+        name_offset = strings_start + len(strings)
+        strings += name
+        records += _RECORD.pack(key_offset, len(key), name_offset, len(name), country, city_id, lat, lon)
+
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(entries)))
+        f.write(records)
+        f.write(strings)
+    os.replace(tmp_path, index_path)
+    return len(entries)
+
+
+class CityIndex:
+    """
+    Read-only, memory-mapped view of an index built by build_city_index.
+    Lookups binary-search the sorted records directly in the mapped file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Maps the index file into memory.
+        Args:
+            path (str): Path to an index built by build_city_index.
+        Raises:
+            ValueError: If the file is not a city index.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a city index")
+
+    def close(self) -> None:
+        """
+        Unmaps the index file.
+        """
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Yields each distinct normalized name in the index, in sorted order.
+        """
+        previous = None
+        for i in range(self._count):
+            key = self._key(i)
+            if key != previous:
+                yield key.decode("utf-8")
+                previous = key
+
+    def _key(self, i: int) -> bytes:
+        key_offset, key_length = struct.unpack_from("<IH", self._mmap, _HEADER.size + i * _RECORD.size)
+        return self._mmap[key_offset:key_offset + key_length]
+
+    def _location(self, i: int) -> Location:
+        _, _, name_offset, name_length, country, city_id, lat, lon = _RECORD.unpack_from(
+            self._mmap, _HEADER.size + i * _RECORD.size
+        )
+        return Location(
+            name=self._mmap[name_offset:name_offset + name_length].decode("utf-8"),
+            country=country.decode("ascii").strip(),
+            lat=round(lat, 4),
+            lon=round(lon, 4),
+            city_id=city_id,
+        )
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _scan(self, prefix: bytes, exact: bool) -> Iterator[int]:
+        i = self._lower_bound(prefix)
+        while i < self._count:
+            key = self._key(i)
+            if key == prefix or (not exact and key.startswith(prefix)):
+                yield i
+                i += 1
+            else:
+                return
+
+    @staticmethod
+    def _split_country(query: str):
+        # "London,GB" narrows the lookup to one country
+        name, _, country = query.rpartition(",")
+        if name and len(country.strip()) == 2:
+            return name, country.strip().upper()
+        return query, None
+
+    def get(self, query: str) -> List[Location]:
+        """
+        Returns every city whose name matches exactly (ignoring case and accents).
+        Args:
+            query (str): A city name, optionally followed by ",CC" with a country code.
+        Returns:
+            List[Location]: The matching cities; several countries may share a name.
+        """
+        name, country = self._split_country(query)
+        matches = [self._location(i) for i in self._scan(index_key(name).encode("utf-8"), exact=True)]
+        if country:
+            matches = [location for location in matches if location.country == country]
+        return matches
+
+    def prefix(self, query: str, limit: int = 10) -> List[Location]:
+        """
+        Returns up to `limit` cities whose name starts with the query, in name order.
+        """
+        name, country = self._split_country(query)
+        matches = []
+        for i in self._scan(index_key(name).encode("utf-8"), exact=False):
+            location = self._location(i)
+            if country is None or location.country == country:
+                matches.append(location)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def fuzzy(self, query: str, limit: int = 5, cutoff: float = 0.6) -> List[Location]:
+        """
+        Suggests cities with names similar to the query, e.g. for misspellings.
+        Candidates share a progressively shorter leading prefix with the query and
+        are ranked by similarity.
+        """
+        key = index_key(self._split_country(query)[0])
+        for prefix_length in range(min(len(key), 4), 0, -1):
+            candidates = {}
+            for i in self._scan(key[:prefix_length].encode("utf-8"), exact=False):
+                candidates.setdefault(self._key(i).decode("utf-8"), i)
+                if len(candidates) >= 5000:
+                    break
+            names = difflib.get_close_matches(key, list(candidates), n=limit, cutoff=cutoff)
+            if names:
+                return [self._location(candidates[name]) for name in names]
+        return []
+
+    def nearby(self, lat: float, lon: float, limit: int = 5, radius_km: float = 50.0) -> List[Location]:
+        """
+        Returns up to `limit` cities within `radius_km` of a point, nearest first.
+        Only the nearest city of each name is returned, and a city at the point itself is skipped.
+        The records are not spatially sorted, so this scans every coordinate
+        (vectorized with NumPy when it is installed).
+        """
+        candidates = limit * 4 # Extra candidates so duplicate names can be dropped
+        if np is not None:
+            # Zero-copy view of the packed records; only the coordinate columns are read
+            records = np.frombuffer(self._mmap, dtype=_RECORD_DTYPE, count=self._count, offset=_HEADER.size)
+            distances = _haversine_km_numpy(lat, lon, records['lat'], records['lon'])
+            del records # Release the view so the mapping can be closed
+            within = np.flatnonzero((distances <= radius_km) & (distances > 0.5))
+            if len(within) > candidates:
+                within = within[np.argpartition(distances[within], candidates - 1)[:candidates]]
+            nearest = sorted(zip(distances[within].tolist(), within.tolist()))
+        else:
+            scored = []
+            for i, record in enumerate(_RECORD.iter_unpack(self._mmap[_HEADER.size:_HEADER.size + self._count * _RECORD.size])):
+                distance = _haversine_km(lat, lon, record[6], record[7])
+                if 0.5 < distance <= radius_km:
+                    scored.append((distance, i))
+            nearest = heapq.nsmallest(candidates, scored)
+
+        matches: List[Location] = []
+        seen = set()
+        for _, i in nearest:
+            key = self._key(i)
+            if key not in seen:
+                seen.add(key)
+                matches.append(self._location(i))
+                if len(matches) >= limit:
+                    break
+        return matches
+
+
+def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Returns the great-circle distance between two points in km.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _haversine_km_numpy(lat: float, lon: float, lats: "np.ndarray", lons: "np.ndarray") -> "np.ndarray":
+    """
+    Returns the great-circle distances in km from one point to arrays of points.
+    """
+    lat, lon = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats, dtype=np.float64), np.radians(lons, dtype=np.float64)
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+if np is not None:
+    # NumPy view of one _RECORD, field for field (packed, little-endian)
+    _RECORD_DTYPE = np.dtype([
+        ("key_offset", "<u4"), ("key_length", "<u2"), ("name_offset", "<u4"), ("name_length", "<u2"),
+        ("country", "S2"), ("city_id", "<u4"), ("lat", "<f4"), ("lon", "<f4"),
+    ])
+    assert _RECORD_DTYPE.itemsize == _RECORD.size
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 3:
+        print(f"Usage: python {argv[0]} city.list.json[.gz] cities.idx")
+        return 2
+    count = build_city_index(argv[1], argv[2])
+    print(f"Indexed {count} cities into {argv[2]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
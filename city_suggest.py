@@ -0,0 +1,137 @@
+from array import array
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from city_index import CityIndex, index_key
+from weather_geocode import Location
+
+try:
+    import numpy as np # Optional: speeds up counting trigram hits
+except ImportError:
+    np = None
+
+
+def trigrams(key: str) -> List[str]:
+    """
+    Returns the distinct trigrams of a padded key, e.g. "rome" -> "  r", " ro", "rom", "ome", "me ".
+    Padding lets short names and leading/trailing letters contribute.
+    """
+    padded = f"  {key} "
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over city names for typo-tolerant suggestions.
+    A query is scored against every name sharing at least one trigram with it,
+    by the Jaccard similarity of their trigram sets.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        """
+        Builds the index.
+        Args:
+            names (Iterable[str]): City names; they are normalized with index_key and
+                duplicates are indexed once.
+        """
+        self._keys: List[str] = list(dict.fromkeys(index_key(name) for name in names))
+        self._trigram_counts = array("H")
+        postings: Dict[str, array] = {}
+        for key_id, key in enumerate(self._keys):
+            key_trigrams = trigrams(key)
+            self._trigram_counts.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array("I")
+                posting.append(key_id)
+        self._postings = postings
+        if np is not None:
+            # Zero-copy NumPy views of the same buffers
+            self._postings_np = {trigram: np.frombuffer(posting, dtype=np.uint32) for trigram, posting in postings.items()}
+            self._trigram_counts_np = np.frombuffer(self._trigram_counts, dtype=np.uint16)
+
+    @classmethod
+    def from_city_index(cls, city_index: CityIndex) -> "TrigramIndex":
+        """
+        Builds a trigram index over every distinct name in an offline city index.
+        """
+        return cls(city_index.iter_keys())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def suggest(self, query: str, limit: int = 5, cutoff: float = 0.3) -> List[Tuple[str, float]]:
+        """
+        Returns the names most similar to the query.
+        Args:
+            query (str): The (possibly misspelled) city name.
+            limit (int): Maximum number of suggestions.
+            cutoff (float): Minimum Jaccard similarity (0-1) for a suggestion.
+        Returns:
+            List[Tuple[str, float]]: (normalized name, similarity) pairs, best first.
+        """
+        all_trigrams = trigrams(index_key(query))
+        query_trigrams = [t for t in all_trigrams if t in self._postings]
+        if not query_trigrams:
+            return []
+        query_size = len(all_trigrams)
+
+        if np is not None:
+            # Count shared trigrams for every candidate that has at least one
+            candidates, hits = np.unique(
+                np.concatenate([self._postings_np[t] for t in query_trigrams]), return_counts=True
+            )
+            scores = hits / (query_size + self._trigram_counts_np[candidates] - hits)
+            keep = np.flatnonzero(scores >= cutoff)
+            if len(keep) > limit:
+                keep = keep[np.argpartition(-scores[keep], limit - 1)[:limit]]
+            best = sorted(keep.tolist(), key=lambda i: -scores[i])
+            return [(self._keys[candidates[i]], float(scores[i])) for i in best]
+
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(self._postings[trigram])
+        scored = []
+        for key_id, shared in counts.items():
+            score = shared / (query_size + self._trigram_counts[key_id] - shared)
+            if score >= cutoff:
+                scored.append((score, key_id))
+        scored.sort(key=lambda item: -item[0])
+        return [(self._keys[key_id], score) for score, key_id in scored[:limit]]
+
+
+class CitySuggester:
+    """
+    Suggests corrections for unknown city names from an offline CityIndex.
+    The trigram index takes a moment to build for a full city list, so it is built
+    in a background thread; until it is ready the index's own fuzzy lookup is used.
+    """
+
+    def __init__(self, city_index: CityIndex):
+        """
+        Starts building the trigram index in the background.
+        Args:
+            city_index (CityIndex): The offline index to suggest names from.
+        """
+        self.city_index = city_index
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trigram-index")
+        self._trigram_index: Future = self._executor.submit(TrigramIndex.from_city_index, city_index)
+        self._executor.shutdown(wait=False)
+
+    def is_known(self, city_name: str) -> bool:
+        """
+        Returns True if the name (optionally with ",CC") matches a city in the index.
+        """
+        return bool(self.city_index.get(city_name))
+
+    def suggest(self, city_name: str, limit: int = 5) -> List[Location]:
+        """
+        Returns up to `limit` known cities whose names are close to `city_name`.
+        """
+        if not self._trigram_index.done() or self._trigram_index.exception() is not None:
+            return self.city_index.fuzzy(city_name, limit=limit)
+        suggestions: List[Location] = []
+        for key, _ in self._trigram_index.result().suggest(city_name, limit=limit):
+            suggestions.extend(self.city_index.get(key))
+        return suggestions[:limit]
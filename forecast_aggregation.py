@@ -0,0 +1,273 @@
+from collections import Counter
+from datetime import date
+from itertools import accumulate
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Hashable
+from weather_data import ForecastData, DailyForecast, ForecastSeries
+
+try:
+    import numpy as np # Optional: enables the vectorized aggregation path
+except ImportError:
+    np = None
+
+SECONDS_PER_DAY = 24 * 60 * 60
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _factorize(values: List[Hashable]) -> Tuple[List[int], List[Any]]:
+    """
+    Maps each value to a small integer code, numbered in order of first appearance.
+    Args:
+        values (List[Hashable]): The values to encode.
+    Returns:
+        Tuple[List[int], List[Any]]: The code for each value, and the distinct values by code.
+    """
+    codes_by_value: Dict[Hashable, Any] = dict.fromkeys(values)
+    for code, value in enumerate(codes_by_value):
+        codes_by_value[value] = code
+    return list(map(codes_by_value.__getitem__, values)), list(codes_by_value)
+
+
+def _build_series(items: List[Dict[str, Any]], utc_offset: int,
+                  timestamps: Optional[List[int]] = None, temps: Optional[List[float]] = None) -> Optional[ForecastSeries]:
+    """
+    Builds the full-resolution series, or returns None if the steps can't be stored,
+    so a problem with the optional series never costs the daily forecasts.
+    """
+    try:
+        return ForecastSeries.from_steps(items, utc_offset, timestamps, temps)
+    except (KeyError, IndexError, TypeError, ValueError, OverflowError) as e:
+        print(f"Skipping full-resolution forecast series: {e!r}")
+        return None
+
+
+def _day_to_date(day: int) -> str:
+    """
+    Converts a day number (days since the Unix epoch) to a YYYY-MM-DD string.
+    """
+    return date.fromordinal(_EPOCH_ORDINAL + day).isoformat()
+
+
+class ForecastAggregator:
+    """
+    Aggregates the 3-hour steps of an OpenWeatherMap forecast into daily forecasts.
+    Uses grouped NumPy reductions when NumPy is installed and there are enough steps
+    to amortize its setup cost, and plain Python otherwise; both paths produce the
+    same DailyForecast rows.
+    """
+    NUMPY_MIN_STEPS = 100 # Below this many steps per call the Python path is faster
+
+    def __init__(self, use_numpy: Optional[bool] = None, include_series: bool = False):
+        """
+        Initializes the aggregator.
+        Args:
+            use_numpy (Optional[bool]): Force the NumPy (True) or pure Python (False) path.
+                By default NumPy is used when it is installed and a call has at least
+                NUMPY_MIN_STEPS steps, e.g. an aggregate_many batch but not a single payload.
+            include_series (bool): Also keep the full-resolution steps as ForecastData.series.
+                Off by default, since building the series costs more than the daily rows.
+        """
+        if use_numpy and np is None:
+            raise ImportError("NumPy is required for use_numpy=True (pip install numpy)")
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        self.numpy_min_steps = 0 if use_numpy else self.NUMPY_MIN_STEPS
+        self.include_series = include_series
+
+    def aggregate(self, payload: Dict[str, Any]) -> ForecastData:
+        """
+        Builds a ForecastData object from a raw forecast response.
+        Args:
+            payload (Dict[str, Any]): The JSON response of the "forecast" endpoint.
+        Returns:
+            ForecastData: Daily forecasts sorted by date.
+        Raises:
+            KeyError: If the payload is missing a required field.
+        """
+        return self.aggregate_many([payload])[0]
+
+    def aggregate_many(self, payloads: Iterable[Dict[str, Any]]) -> List[ForecastData]:
+        """
+        Builds ForecastData objects for many raw forecast responses at once.
+        Steps are bucketed by the city's local date, using the UTC offset in the
+        payload's `city.timezone` (UTC if it is missing). On the NumPy path the steps of all payloads are concatenated and grouped by
+        (city, day) in a single vectorized pass, so the per-city overhead is small.
+        Args:
+            payloads (Iterable[Dict[str, Any]]): JSON responses of the "forecast" endpoint.
+        Returns:
+            List[ForecastData]: One ForecastData per payload, in input order.
+        Raises:
+            KeyError: If any payload is missing a required field.
+        """
+        payloads = list(payloads)
+        item_lists = [payload['list'] for payload in payloads]
+        utc_offsets = [payload['city'].get('timezone', 0) for payload in payloads] # Seconds east of UTC
+        columns: List[Tuple[Optional[List[int]], Optional[List[float]]]] = [(None, None)] * len(payloads)
+        if self.use_numpy and sum(map(len, item_lists)) >= self.numpy_min_steps:
+            daily_by_payload, timestamps, temps = self._aggregate_numpy(item_lists, utc_offsets)
+            if self.include_series:
+                # Reuse the dt and temp columns already extracted for the aggregation
+                ends = list(accumulate(map(len, item_lists)))
+                timestamps, temps = timestamps.tolist(), temps.tolist()
+                columns = [(timestamps[end - len(items):end], temps[end - len(items):end])
+                           for items, end in zip(item_lists, ends)]
+        else:
+            daily_by_payload = [
+                self._aggregate_python(items, utc_offset) for items, utc_offset in zip(item_lists, utc_offsets)
+            ]
+
+        return [
+            ForecastData(
+                city=payload['city']['name'],
+                country=payload['city']['country'],
+                daily_forecasts=daily_forecasts,
+                series=_build_series(items, utc_offset, *step_columns) if self.include_series else None
+            )
+            for payload, items, utc_offset, daily_forecasts, step_columns
+            in zip(payloads, item_lists, utc_offsets, daily_by_payload, columns)
+        ]
+
+    def _aggregate_python(self, items: List[Dict[str, Any]], utc_offset: int) -> List[DailyForecast]:
+        """
+        Aggregates forecast steps per local day with plain Python.
+        """
+        # Bucket by local day number (days since the epoch) using integer arithmetic only
+        forecast_by_day: Dict[int, List[Dict[str, Any]]] = {}
+        for item in items:
+            forecast_by_day.setdefault((item['dt'] + utc_offset) // SECONDS_PER_DAY, []).append(item)
+
+        daily_forecasts: List[DailyForecast] = []
+        for day, readings in forecast_by_day.items():
+            temps = [r['main']['temp'] for r in readings]
+            descriptions = [r['weather'][0]['description'] for r in readings]
+            icons = [r['weather'][0]['icon'] for r in readings]
+
+            daily_forecasts.append(DailyForecast(
+                date=_day_to_date(day),
+                min_temp=min(temps),
+                max_temp=max(temps),
+                avg_temp=sum(temps) / len(temps),
+                # Most common description and icon for the day
+                description=Counter(descriptions).most_common(1)[0][0].capitalize(),
+                icon=Counter(icons).most_common(1)[0][0]
+            ))
+
+        daily_forecasts.sort(key=lambda x: x.date)
+        return daily_forecasts
+
+    def _aggregate_numpy(
+        self, item_lists: List[List[Dict[str, Any]]], utc_offsets: List[int]
+    ) -> Tuple[List[List[DailyForecast]], "np.ndarray", "np.ndarray"]:
+        """
+        Aggregates forecast steps of one or more payloads per (payload, local day) with
+        grouped NumPy reductions. The nested JSON is walked once per column; grouping
+        and all per-day statistics are then computed without Python-level loops.
+        Returns the daily forecasts per payload, plus the concatenated timestamp and
+        temperature columns of all steps.
+        """
+        daily_by_payload: List[List[DailyForecast]] = [[] for _ in item_lists]
+        steps = [item for items in item_lists for item in items]
+        if not steps:
+            return daily_by_payload, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        weathers = [item['weather'][0] for item in steps]
+        description_codes, descriptions = _factorize([weather['description'] for weather in weathers])
+        icon_codes, icons = _factorize([weather['icon'] for weather in weathers])
+        temps = np.fromiter((item['main']['temp'] for item in steps), dtype=np.float64, count=len(steps))
+        step_counts = [len(items) for items in item_lists]
+        payload_ids = np.repeat(np.arange(len(item_lists)), step_counts)
+        timestamps = np.fromiter((item['dt'] for item in steps), dtype=np.int64, count=len(steps))
+        days = (timestamps + np.repeat(np.asarray(utc_offsets, dtype=np.int64), step_counts)) // SECONDS_PER_DAY
+
+        # One group per (payload, day); np.unique orders groups by payload, then by day
+        first_day = int(days.min())
+        day_span = int(days.max()) - first_day + 1
+        group_keys, groups = np.unique(payload_ids * day_span + (days - first_day), return_inverse=True)
+        group_payloads = (group_keys // day_span).tolist()
+        group_days = (group_keys % day_span).tolist()
+        date_by_day = {day: _day_to_date(first_day + day) for day in set(group_days)}
+        dates = [date_by_day[day] for day in group_days]
+
+        stats = _grouped_stats(
+            groups, len(group_keys), temps,
+            np.asarray(description_codes, dtype=np.intp), len(descriptions),
+            np.asarray(icon_codes, dtype=np.intp), len(icons),
+        )
+        for payload_index, daily in zip(group_payloads, _build_daily_forecasts(dates, descriptions, icons, *stats)):
+            daily_by_payload[payload_index].append(daily)
+        return daily_by_payload, timestamps, temps
+
+
+def _grouped_mode(groups: "np.ndarray", n_groups: int, codes: "np.ndarray", n_codes: int) -> "np.ndarray":
+    """
+    Returns the most frequent code in each group. As with Counter.most_common,
+    ties go to the code that appears first within the group.
+    """
+    # Count each (group, code) pair; only pairs that occur are materialized
+    cells = groups.astype(np.int64) * n_codes + codes
+    pairs, first_seen, counts = np.unique(cells, return_index=True, return_counts=True)
+    pair_groups = pairs // n_codes
+    # Order pairs by group, then highest count, then earliest appearance; keep each group's first
+    order = np.lexsort((first_seen, -counts, pair_groups))
+    is_group_head = np.ones(len(order), dtype=bool)
+    is_group_head[1:] = pair_groups[order][1:] != pair_groups[order][:-1]
+    modes = np.empty(n_groups, dtype=np.intp)
+    modes[pair_groups[order][is_group_head]] = (pairs % n_codes)[order][is_group_head]
+    return modes
+
+
+def _grouped_stats(
+    groups: "np.ndarray", n_groups: int, temps: "np.ndarray",
+    description_codes: "np.ndarray", n_descriptions: int,
+    icon_codes: "np.ndarray", n_icons: int,
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Computes per-group min/max/mean temperature and modal description/icon codes.
+    Args:
+        groups (np.ndarray): Group id (0..n_groups-1) of each step.
+        n_groups (int): Number of groups.
+        temps (np.ndarray): Temperature of each step.
+        description_codes (np.ndarray): Description code of each step.
+        n_descriptions (int): Number of distinct descriptions.
+        icon_codes (np.ndarray): Icon code of each step.
+        n_icons (int): Number of distinct icons.
+    Returns:
+        Tuple of arrays indexed by group id: min temps, max temps, mean temps,
+        modal description codes and modal icon codes.
+    """
+    # Sort steps by group (stable, so order within a group is kept) for segment reductions
+    order = np.argsort(groups, kind="stable")
+    sorted_temps = temps[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    min_temps = np.minimum.reduceat(sorted_temps, starts)
+    max_temps = np.maximum.reduceat(sorted_temps, starts)
+    avg_temps = np.bincount(groups, weights=temps, minlength=n_groups) / counts
+    return (
+        min_temps, max_temps, avg_temps,
+        _grouped_mode(groups, n_groups, description_codes, n_descriptions),
+        _grouped_mode(groups, n_groups, icon_codes, n_icons),
+    )
+
+
+def _build_daily_forecasts(
+    dates: List[str], descriptions: List[str], icons: List[str],
+    min_temps: "np.ndarray", max_temps: "np.ndarray", avg_temps: "np.ndarray",
+    description_modes: "np.ndarray", icon_modes: "np.ndarray",
+) -> List[DailyForecast]:
+    """
+    Turns grouped statistics back into DailyForecast rows, one per entry in `dates`.
+    """
+    return [
+        DailyForecast(
+            date=date_str,
+            min_temp=float(min_temp),
+            max_temp=float(max_temp),
+            avg_temp=float(avg_temp),
+            description=descriptions[description_code].capitalize(),
+            icon=icons[icon_code]
+        )
+        for date_str, min_temp, max_temp, avg_temp, description_code, icon_code in zip(
+            dates, min_temps.tolist(), max_temps.tolist(), avg_temps.tolist(),
+            description_modes.tolist(), icon_modes.tolist(),
+        )
+    ]
@@ -1,36 +1,355 @@
+import argparse
+import contextlib
 import os
 import sys
+import time
+from collections import deque
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.panel import Panel
 from rich.text import Text
 from rich.box import ROUNDED
+from rich.live import Live
 from weather_api import WeatherAPI
+from weather_cache import SQLiteResponseCache
+from weather_limits import RateLimiter
+from weather_geocode import CityResolver, Location
+from city_index import CityIndex
+from city_suggest import CitySuggester
 from weather_display import WeatherDisplay
-from weather_data import WeatherData, ForecastData
+from weather_data import WeatherData, ForecastData, CityReport
+from weather_export import SINKS, open_sink
+from weather_server import WeatherServer
 import asyncio
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, TextIO, Tuple, Union
 
 # Initialize Rich Console for beautiful terminal output
 console = Console()
 
-async def main():
+# Responses are cached on disk so a restarted session starts warm
+CACHE_PATH = os.getenv("WEATHER_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "pyweather", "responses.sqlite3"))
+# City names are geocoded once and then queried by location
+GEOCODE_PATH = os.getenv("WEATHER_GEOCODE_PATH", os.path.join(os.path.dirname(CACHE_PATH), "geocode.json"))
+# Optional offline city index built with `python city_index.py city.list.json.gz <path>`
+CITY_INDEX_PATH = os.getenv("WEATHER_CITY_INDEX", os.path.join(os.path.dirname(CACHE_PATH), "cities.idx"))
+
+# OpenWeatherMap plan quotas (defaults match the free tier)
+CALLS_PER_MINUTE = int(os.getenv("WEATHER_CALLS_PER_MINUTE", RateLimiter.FREE_CALLS_PER_MINUTE))
+CALLS_PER_DAY = int(os.getenv("WEATHER_CALLS_PER_DAY", RateLimiter.FREE_CALLS_PER_DAY))
+
+# How long past its TTL cached data may still be shown while it is refreshed in the background
+STALE_WHILE_REVALIDATE = {"weather": 50 * 60, "forecast": 9 * 60 * 60}
+
+# Cities prefetched after each interactive query: the last few queried, and those nearby
+RECENT_CITIES = 5
+NEARBY_CITIES = 3
+
+# Default refresh interval for --watch; current weather is cached for 10 minutes anyway
+DEFAULT_WATCH_INTERVAL = 10 * 60
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 60 * 60}
+
+def parse_duration(value: str) -> float:
+    """
+    Parses a duration such as "90", "30s", "10m" or "1h" into seconds.
+    """
+    value = value.strip().lower()
+    unit = _DURATION_UNITS.get(value[-1:], None)
+    try:
+        seconds = float(value[:-1] if unit else value) * (unit or 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid duration '{value}' (use e.g. 30s, 10m or 1h)") from None
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("duration must be positive")
+    return seconds
+
+def positive_int(value: str) -> int:
+    """
+    Parses a command-line value that must be a whole number greater than zero.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number '{value}'") from None
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be greater than zero")
+    return number
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """
+    Parses "[HOST:]PORT" for --serve; the host defaults to 127.0.0.1.
+    """
+    host, _, port = value.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid address '{value}' (use PORT or HOST:PORT)") from None
+
+def parse_city_list(value: str) -> List[str]:
+    """
+    Splits a comma-separated list of cities. A two-letter item is taken as the country
+    code of the city before it, so "London,GB,Paris" gives ["London,GB", "Paris"].
+    """
+    cities: List[str] = []
+    for item in (part.strip() for part in value.split(",")):
+        if not item:
+            continue
+        if cities and len(item) == 2 and item.isalpha() and "," not in cities[-1]:
+            cities[-1] = f"{cities[-1]},{item.upper()}"
+        else:
+            cities.append(item)
+    return cities
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Parses command-line arguments. Without arguments the app runs interactively.
+    """
+    parser = argparse.ArgumentParser(description="PyWeather: current weather and 5-day forecasts from OpenWeatherMap.")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="Non-interactive mode: read city names, one per line, from FILE (or stdin if omitted or '-') "
+                             "and write results as they complete.")
+    parser.add_argument("--concurrency", type=positive_int, default=WeatherAPI.DEFAULT_CONCURRENCY,
+                        help=f"Cities fetched at once in batch mode and per /batch request (default: {WeatherAPI.DEFAULT_CONCURRENCY}).")
+    parser.add_argument("--format", choices=["text", *SINKS], default="text",
+                        help="Batch output format: tab-separated text (default), ndjson, csv, "
+                             "or parquet/arrow for bulk exports (requires pyarrow).")
+    parser.add_argument("--output", metavar="FILE",
+                        help="Write batch results to FILE instead of stdout.")
+    parser.add_argument("--watch", type=parse_city_list, metavar="CITIES",
+                        help="Keep a live-updating table of comma-separated cities, e.g. London,GB,Tokyo.")
+    parser.add_argument("--interval", type=parse_duration, default=DEFAULT_WATCH_INTERVAL,
+                        help="Refresh interval for --watch, e.g. 30s, 10m or 1h (default: 10m).")
+    parser.add_argument("--serve", type=parse_address, metavar="[HOST:]PORT",
+                        help="Run an HTTP gateway serving /current, /forecast and /batch from one shared client and cache.")
+    args = parser.parse_args(argv)
+    if sum(bool(mode) for mode in (args.batch, args.watch, args.serve)) > 1:
+        parser.error("--batch, --watch and --serve cannot be combined")
+    if args.watch is not None and not args.watch:
+        parser.error("--watch needs at least one city")
+    if not args.batch and (args.format != "text" or args.output):
+        parser.error("--format and --output require --batch")
+    return args
+
+async def read_cities(stream: TextIO) -> AsyncIterator[str]:
+    """
+    Yields city names from a text stream, one per line, skipping blank lines and '#' comments.
+    Lines are read in a worker thread so a slow pipe doesn't block in-flight requests.
+    """
+    while True:
+        line = await asyncio.to_thread(stream.readline)
+        if not line:
+            return
+        city = line.strip()
+        if city and not city.startswith("#"):
+            yield city
+
+def format_report_line(report: CityReport) -> str:
+    """
+    Formats a batch result as a tab-separated line: query, city, country, temperature,
+    description and the number of forecast days.
+    """
+    current = report.current
+    forecast_days = len(report.forecast.daily_forecasts) if report.forecast else 0
+    return "\t".join([
+        report.city, current.city, current.country,
+        f"{current.temperature:.1f}", current.description, str(forecast_days),
+    ])
+
+def open_output(path: Optional[str], binary: bool):
+    """
+    Opens the batch output file, or returns stdout (as a binary stream if requested) when no path is given.
+    """
+    if path is None or path == "-":
+        return sys.stdout.buffer if binary else sys.stdout
+    return open(path, "wb") if binary else open(path, "w", encoding="utf-8", newline="")
+
+async def run_batch(weather_api: WeatherAPI, source: str, concurrency: int,
+                    output_format: str = "text", output_path: Optional[str] = None) -> int:
+    """
+    Fetches weather for every city in `source` concurrently and writes the results
+    as they complete. Failures are reported on stderr.
+    Args:
+        weather_api (WeatherAPI): The client to fetch with.
+        source (str): File to read city names from, or "-" for stdin.
+        concurrency (int): Maximum number of cities fetched at once.
+        output_format (str): "text" for tab-separated lines, or a weather_export sink name.
+        output_path (Optional[str]): File to write to; stdout when omitted.
+    Returns:
+        int: The process exit status: 0 if every city succeeded, 1 otherwise.
+    """
+    error_console = Console(stderr=True)
+    try:
+        stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    except OSError as e:
+        error_console.print(f"[bold red]Cannot read cities: {e}[/bold red]")
+        return 1
+
+    sink_class = SINKS.get(output_format)
+    out = None
+    try:
+        out = open_output(output_path, binary=sink_class is not None and sink_class.binary)
+        sink = open_sink(output_format, out) if sink_class is not None else None
+    except (ImportError, OSError) as e:
+        error_console.print(f"[bold red]Cannot write {output_format} output: {e}[/bold red]")
+        if out not in (None, sys.stdout, sys.stdout.buffer):
+            out.close()
+        if stream is not sys.stdin:
+            stream.close()
+        return 1
+
+    failed = 0
+    try:
+        # Keep diagnostics printed by WeatherAPI out of the result stream
+        with contextlib.redirect_stdout(sys.stderr):
+            async for report in weather_api.get_many(read_cities(stream), concurrency=concurrency):
+                if report.current is None:
+                    failed += 1
+                    error_console.print(f"[bold red]Could not retrieve current weather for {report.city}.[/bold red]")
+                    continue
+                if sink is not None:
+                    sink.write(report)
+                else:
+                    out.write(format_report_line(report) + "\n")
+                    out.flush()
+    finally:
+        if sink is not None:
+            sink.close()
+        if out not in (sys.stdout, sys.stdout.buffer):
+            out.close()
+        if stream is not sys.stdin:
+            stream.close()
+    return 1 if failed else 0
+
+class StdinLineReader:
+    """
+    Reads lines from stdin without blocking the event loop.
+    Where the loop can watch stdin (terminals and pipes on Unix) it reads when input
+    is ready, so no thread is left stuck in input() and Ctrl+C exits at once.
+    Otherwise (regular files, Windows) it falls back to reading in a worker thread.
+    """
+
+    def __init__(self):
+        self._fd = sys.stdin.fileno()
+        self._buffer = b""
+
+    async def readline(self) -> str:
+        """
+        Returns the next line including its newline, or "" at end of input.
+        """
+        loop = asyncio.get_running_loop()
+        while b"\n" not in self._buffer:
+            ready = loop.create_future()
+            try:
+                loop.add_reader(self._fd, lambda: ready.done() or ready.set_result(None))
+            except (NotImplementedError, PermissionError):
+                # Not pollable: finish the line in a worker thread
+                line = self._buffer.decode("utf-8", "replace") + await asyncio.to_thread(sys.stdin.readline)
+                self._buffer = b""
+                return line
+            try:
+                await ready
+            finally:
+                loop.remove_reader(self._fd)
+            chunk = os.read(self._fd, 4096)
+            if not chunk:
+                line, self._buffer = self._buffer, b""
+                return line.decode("utf-8", "replace")
+            self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.decode("utf-8", "replace") + "\n"
+
+async def ask(stdin: StdinLineReader, prompt: str) -> Optional[str]:
+    """
+    Shows a Rich prompt and waits for the answer while the event loop keeps running.
+    Returns:
+        Optional[str]: The answer without its newline, or None if stdin was closed.
+    """
+    console.print(Prompt(prompt, console=console).make_prompt(None), end="")
+    line = await stdin.readline()
+    if not line:
+        console.print()
+        return None
+    return line.rstrip("\r\n")
+
+async def prefetch_candidates(weather_api: WeatherAPI, city_index: Optional[CityIndex],
+                              city: str, recent: Deque[str]) -> List[Union[str, Location]]:
+    """
+    Returns the cities worth prefetching after a query: recently queried cities
+    (most recent first) and, with an offline index, cities near the queried one.
+    """
+    candidates: List[Union[str, Location]] = [name for name in reversed(recent) if name != city]
+    location = weather_api.resolver.lookup(city) if weather_api.resolver is not None else None
+    if city_index is not None and location is not None:
+        # The index scan is CPU-bound; keep it off the event loop
+        nearby = await asyncio.to_thread(city_index.nearby, location.lat, location.lon, NEARBY_CITIES + 1)
+        candidates.extend(n for n in nearby if n.name != location.name)
+    return candidates
+
+async def run_watch(weather_api: WeatherAPI, weather_display: WeatherDisplay, cities: List[str], interval: float) -> int:
+    """
+    Shows a live table of the given cities and refreshes each one every `interval` seconds
+    until interrupted. Refreshes are staggered evenly over the interval, so requests are
+    spread out instead of arriving in one burst, and the table is only redrawn when a
+    refresh completes.
+    Returns:
+        int: The process exit status.
+    """
+    rows: Dict[str, Optional[Tuple[str, ...]]] = dict.fromkeys(cities)
+    changed: Dict[str, Set[int]] = {}
+    updated: Dict[str, str] = {}
+    loop = asyncio.get_running_loop()
+
+    with Live(weather_display.build_watch_table(rows, changed, updated, interval),
+              console=console, auto_refresh=False) as live:
+
+        async def refresh(city: str, offset: float) -> None:
+            next_run = loop.time() + offset
+            while True:
+                await asyncio.sleep(max(0.0, next_run - loop.time()))
+                next_run += interval # Fixed schedule, so slow requests don't make refreshes drift
+                # Accept cached data only if it was fetched during this refresh (e.g. by a
+                # coalesced request), so every tick goes to the upstream exactly once
+                report = await weather_api.get_city_report(city, min_fetched_at=time.time())
+                cells = weather_display.watch_row(report)
+                if cells is None:
+                    # Keep the last good values on screen
+                    updated[city] = f"[red]failed {time.strftime('%H:%M:%S')}[/red]"
+                else:
+                    previous = rows[city]
+                    changed[city] = {i for i, cell in enumerate(cells) if previous is None or previous[i] != cell}
+                    rows[city] = cells
+                    updated[city] = time.strftime("%H:%M:%S")
+                live.update(weather_display.build_watch_table(rows, changed, updated, interval), refresh=True)
+
+        await asyncio.gather(*(
+            refresh(city, i * interval / len(cities)) for i, city in enumerate(cities)
+        ))
+    return 0
+
+async def main(argv: Optional[List[str]] = None) -> int:
     """
     Main asynchronous function to run the weather application.
     It handles user input, fetches data, and displays it.
+    Returns:
+        int: The process exit status.
     """
-    console.print(Panel(
-        Text("✨ Welcome to the PyWeather Forecast! ✨", justify="center", style="bold green"),
-        title="[bold blue]PyWeather[/bold blue]",
-        title_align="center",
-        border_style="cyan",
-        box=ROUNDED
-    ))
+    args = parse_args(argv)
+    # In batch mode stdout carries the results, so messages go to stderr
+    ui_console = Console(stderr=True) if args.batch else console
+
+    if not (args.batch or args.watch or args.serve):
+        console.print(Panel(
+            Text("✨ Welcome to the PyWeather Forecast! ✨", justify="center", style="bold green"),
+            title="[bold blue]PyWeather[/bold blue]",
+            title_align="center",
+            border_style="cyan",
+            box=ROUNDED
+        ))
 
     # Get API key from environment variable
     api_key = os.getenv("OPENWEATHER_API_KEY")
 
     if not api_key:
-        console.print(Panel(
+        ui_console.print(Panel(
             Text("🚨 [bold red]API Key Missing![/bold red] Please set the 'OPENWEATHER_API_KEY' environment variable.\n"
                  "You can get a free API key from OpenWeatherMap (openweathermap.org/api).",
                  justify="center", style="yellow"),
@@ -38,42 +357,90 @@ async def main():
             border_style="red",
             box=ROUNDED
         ))
-        sys.exit(1) # Exit if API key is not found
+        return 1 # Exit if API key is not found
 
-    weather_api = WeatherAPI(api_key)
-    weather_display = WeatherDisplay(console)
+    cache = SQLiteResponseCache(CACHE_PATH)
+    cache.purge_expired(grace=max(STALE_WHILE_REVALIDATE.values())) # Drop rows too old to serve
+    rate_limiter = RateLimiter(calls_per_minute=CALLS_PER_MINUTE, calls_per_day=CALLS_PER_DAY)
+    city_index = CityIndex(CITY_INDEX_PATH) if os.path.exists(CITY_INDEX_PATH) else None
+    async with WeatherAPI(api_key, cache=cache, rate_limiter=rate_limiter,
+                          stale_while_revalidate=STALE_WHILE_REVALIDATE,
+                          resolver=CityResolver(GEOCODE_PATH, index=city_index)) as weather_api:
+        if args.batch:
+            return await run_batch(weather_api, args.batch, args.concurrency, args.format, args.output)
 
-    while True:
-        city = Prompt.ask("[bold magenta]Enter city name[/bold magenta] (e.g., London, Tokyo, New York) or 'exit' to quit")
-
-        if city.lower() == 'exit':
-            console.print(Panel(
-                Text("👋 Thank you for using PyWeather! Goodbye! 👋", justify="center", style="bold green"),
-                title="[bold blue]Exiting[/bold blue]",
-                title_align="center",
-                border_style="cyan",
-                box=ROUNDED
-            ))
-            break
-
-        console.print(f"[bold yellow]Fetching weather for {city}...[/bold yellow]")
-
-        # Fetch current weather
-        current_weather_data = await weather_api.get_current_weather(city)
-        if current_weather_data:
-            weather_display.display_current_weather(current_weather_data)
-        else:
-            console.print(f"[bold red]Could not retrieve current weather for {city}. Please check the city name.[/bold red]")
+        weather_display = WeatherDisplay(console)
+        if args.watch:
+            return await run_watch(weather_api, weather_display, args.watch, args.interval)
+        if args.serve:
+            host, port = args.serve
+            console.print(f"[bold green]Serving weather on http://{host}:{port}[/bold green] (Ctrl+C to stop)")
+            await WeatherServer(weather_api, batch_concurrency=args.concurrency).serve(host, port)
+            return 0
 
-        # Fetch forecast
-        forecast_data = await weather_api.get_five_day_forecast(city)
-        if forecast_data:
-            weather_display.display_forecast(forecast_data)
-        else:
-            console.print(f"[bold red]Could not retrieve forecast for {city}.[/bold red]")
+        # Only the interactive prompt suggests names; building the trigram index takes seconds
+        suggester = CitySuggester(city_index) if city_index is not None else None
+        recent_cities: Deque[str] = deque(maxlen=RECENT_CITIES)
+        stdin = StdinLineReader()
+
+        while True:
+            # Background refreshes keep running while the user types
+            city = await ask(stdin, "[bold magenta]Enter city name[/bold magenta] (e.g., London, Tokyo, New York) or 'exit' to quit")
+            if city is None:
+                city = 'exit' # stdin closed
+
+            if city.lower() == 'exit':
+                console.print(Panel(
+                    Text("👋 Thank you for using PyWeather! Goodbye! 👋", justify="center", style="bold green"),
+                    title="[bold blue]Exiting[/bold blue]",
+                    title_align="center",
+                    border_style="cyan",
+                    box=ROUNDED
+                ))
+                break
+
+            # Catch likely misspellings locally before spending a request on them. The offline
+            # list can be incomplete (or the name spelled differently), so the user may go ahead.
+            if suggester is not None and not suggester.is_known(city):
+                suggestions = suggester.suggest(city) or city_index.prefix(city, limit=5)
+                if suggestions:
+                    names = ", ".join(f"{s.name},{s.country}" for s in suggestions)
+                    console.print(f"[bold yellow]'{city}' is not in the offline city list.[/bold yellow] Did you mean: [cyan]{names}[/cyan]?")
+                    answer = await ask(stdin, f"Look up '{city}' anyway? (y/N)")
+                    if (answer or "").strip().lower() not in ("y", "yes"):
+                        continue
+
+            console.print(f"[bold yellow]Fetching weather for {city}...[/bold yellow]")
+
+            # Start both requests now, so the forecast downloads while current weather is shown
+            current_task = asyncio.create_task(weather_api.get_current_weather(city))
+            forecast_task = asyncio.create_task(weather_api.get_five_day_forecast(city))
+
+            current = await current_task
+            if current:
+                weather_display.display_current_weather(current)
+            else:
+                console.print(f"[bold red]Could not retrieve current weather for {city}. Please check the city name.[/bold red]")
+
+            forecast = await forecast_task
+            if forecast:
+                weather_display.display_forecast(forecast)
+            else:
+                console.print(f"[bold red]Could not retrieve forecast for {city}.[/bold red]")
+
+            # Warm the cache for likely next queries while the user reads and types
+            if current:
+                weather_api.prefetch(await prefetch_candidates(weather_api, city_index, city, recent_cities))
+                if city in recent_cities:
+                    recent_cities.remove(city)
+                recent_cities.append(city)
 
-        console.print("\n" + "="*80 + "\n") # Separator for next query
+            console.print("\n" + "="*80 + "\n") # Separator for next query
+    return 0
 
 if __name__ == "__main__":
     # Run the main asynchronous function
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        sys.exit(130) # Ctrl+C, e.g. to leave watch mode
\ No newline at end of file
@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+import city_index
+from city_index import CityIndex, build_city_index
+
+CITIES = [
+    {"id": 2643743, "name": "London", "country": "GB", "coord": {"lat": 51.50853, "lon": -0.12574}},
+    {"id": 6058560, "name": "London", "country": "CA", "coord": {"lat": 42.98339, "lon": -81.23304}},
+    {"id": 2643741, "name": "City of London", "country": "GB", "coord": {"lat": 51.51279, "lon": -0.09184}},
+    {"id": 2653261, "name": "Croydon", "country": "GB", "coord": {"lat": 51.38333, "lon": -0.1}},
+    {"id": 2657832, "name": "Watford", "country": "GB", "coord": {"lat": 51.65531, "lon": -0.39602}},
+    {"id": 2636503, "name": "Sutton", "country": "GB", "coord": {"lat": 51.35, "lon": -0.2}},
+    {"id": 2657896, "name": "Zürich", "country": "CH", "coord": {"lat": 47.36667, "lon": 8.55}},
+    {"id": 2988507, "name": "Paris", "country": "FR", "coord": {"lat": 48.85341, "lon": 2.3488}},
+    {"id": 4717560, "name": "Paris", "country": "US", "coord": {"lat": 33.66094, "lon": -95.55551}},
+    {"id": 1, "name": "Broken"}, # No coordinates: skipped
+]
+
+
+class CityIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        source = os.path.join(cls.tmp.name, "city.list.json.gz")
+        with gzip.open(source, "wt", encoding="utf-8") as f:
+            json.dump(CITIES, f)
+        cls.path = os.path.join(cls.tmp.name, "cities.idx")
+        cls.count = build_city_index(source, cls.path)
+        cls.index = CityIndex(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+        cls.tmp.cleanup()
+
+    def test_build_skips_malformed_entries(self):
+        self.assertEqual(self.count, len(CITIES) - 1)
+        self.assertEqual(len(self.index), len(CITIES) - 1)
+
+    def test_get_round_trips_records(self):
+        (zurich,) = self.index.get("zurich")
+        self.assertEqual((zurich.name, zurich.country, zurich.city_id), ("Zürich", "CH", 2657896))
+        self.assertAlmostEqual(zurich.lat, 47.3667, places=4)
+        self.assertAlmostEqual(zurich.lon, 8.55, places=4)
+        self.assertEqual({l.country for l in self.index.get("  LONDON ")}, {"GB", "CA"})
+        self.assertEqual([l.city_id for l in self.index.get("Paris, us")], [4717560])
+        self.assertEqual(self.index.get("Atlantis"), [])
+
+    def test_prefix_returns_names_in_order(self):
+        self.assertEqual([l.name for l in self.index.prefix("c")], ["City of London", "Croydon"])
+        self.assertEqual([l.country for l in self.index.prefix("lon,CA")], ["CA"])
+        self.assertEqual(len(self.index.prefix("", limit=3)), 3)
+
+    def test_iter_keys_yields_distinct_sorted_keys(self):
+        keys = list(self.index.iter_keys())
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertIn("zurich", keys)
+
+    def test_fuzzy_suggests_close_names(self):
+        self.assertEqual([l.name for l in self.index.fuzzy("Croydn")], ["Croydon"])
+
+    def test_nearby_orders_by_distance_and_skips_the_point_itself(self):
+        london = self.index.get("London,GB")[0]
+        nearby = self.index.nearby(london.lat, london.lon, limit=3, radius_km=30)
+        self.assertEqual([l.name for l in nearby], ["City of London", "Croydon", "Sutton"])
+        self.assertEqual(self.index.nearby(london.lat, london.lon, radius_km=1), [])
+
+    def test_nearby_without_numpy_matches(self):
+        london = self.index.get("London,GB")[0]
+        expected = self.index.nearby(london.lat, london.lon, limit=4, radius_km=50)
+        np, city_index.np = city_index.np, None
+        try:
+            self.assertEqual(self.index.nearby(london.lat, london.lon, limit=4, radius_km=50), expected)
+        finally:
+            city_index.np = np
+
+    def test_rejects_files_that_are_not_an_index(self):
+        path = os.path.join(self.tmp.name, "not-an-index")
+        with open(path, "wb") as f:
+            f.write(b"\0" * 64)
+        with self.assertRaises(ValueError):
+            CityIndex(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import random
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import forecast_aggregation
+from forecast_aggregation import ForecastAggregator
+from weather_data import ForecastSeries
+
+START = 1700000000 # 2023-11-14 22:13:20 UTC, close to local midnight for many offsets
+UTC_OFFSETS = [-36000, -12600, 0, 3600, 19800, 45900, 50400]
+CONDITIONS = [("clear sky", "01d"), ("light rain", "10n"), ("few clouds", "02d"), ("snow", "13d")]
+
+
+def make_payload(utc_offset: int, steps: int = 40, seed: int = 0, step_seconds: int = 3 * 60 * 60):
+    """
+    Builds a forecast response with pseudo-random temperatures and conditions.
+    """
+    rng = random.Random(seed)
+    items = []
+    for i in range(steps):
+        description, icon = rng.choice(CONDITIONS)
+        items.append({
+            "dt": START + i * step_seconds,
+            "main": {"temp": round(rng.uniform(-10, 35), 2), "feels_like": 0.0, "humidity": 50, "pressure": 1010},
+            "weather": [{"description": description, "icon": icon}],
+            "wind": {"speed": 1.0},
+        })
+    return {"list": items, "city": {"name": f"City{utc_offset}", "country": "XX", "timezone": utc_offset}}
+
+
+def reference_daily(payload):
+    """
+    Straightforward reference: local date via datetime, mode via Counter.most_common.
+    """
+    tz = timezone(timedelta(seconds=payload["city"].get("timezone", 0)))
+    days = {}
+    for item in payload["list"]:
+        day = datetime.fromtimestamp(item["dt"], tz).date().isoformat()
+        days.setdefault(day, []).append(item)
+    rows = []
+    for day in sorted(days):
+        readings = days[day]
+        temps = [r["main"]["temp"] for r in readings]
+        rows.append((
+            day, min(temps), max(temps), sum(temps) / len(temps),
+            Counter(r["weather"][0]["description"] for r in readings).most_common(1)[0][0].capitalize(),
+            Counter(r["weather"][0]["icon"] for r in readings).most_common(1)[0][0],
+        ))
+    return rows
+
+
+def as_rows(forecast):
+    return [(d.date, d.min_temp, d.max_temp, d.avg_temp, d.description, d.icon) for d in forecast.daily_forecasts]
+
+
+class ForecastAggregationTest(unittest.TestCase):
+
+    def assertRowsEqual(self, actual, expected):
+        self.assertEqual(len(actual), len(expected))
+        for got, want in zip(actual, expected):
+            self.assertEqual(got[0], want[0])
+            for g, w in zip(got[1:4], want[1:4]):
+                self.assertAlmostEqual(g, w, places=9)
+            self.assertEqual(got[4:], want[4:])
+
+    def test_python_path_matches_reference_across_utc_offsets(self):
+        aggregator = ForecastAggregator(use_numpy=False)
+        for utc_offset in UTC_OFFSETS:
+            with self.subTest(utc_offset=utc_offset):
+                payload = make_payload(utc_offset, seed=utc_offset)
+                self.assertRowsEqual(as_rows(aggregator.aggregate(payload)), reference_daily(payload))
+
+    @unittest.skipIf(forecast_aggregation.np is None, "NumPy is not installed")
+    def test_numpy_path_matches_python_path_across_utc_offsets(self):
+        python, vectorized = ForecastAggregator(use_numpy=False), ForecastAggregator(use_numpy=True)
+        for utc_offset in UTC_OFFSETS:
+            for seed in range(5):
+                with self.subTest(utc_offset=utc_offset, seed=seed):
+                    payload = make_payload(utc_offset, seed=seed)
+                    self.assertRowsEqual(as_rows(vectorized.aggregate(payload)), as_rows(python.aggregate(payload)))
+
+    def test_aggregate_many_matches_reference(self):
+        payloads = [make_payload(utc_offset, steps=10 + i, seed=i) for i, utc_offset in enumerate(UTC_OFFSETS)]
+        payloads.append(make_payload(0, steps=0))
+        for use_numpy in (False, True):
+            if use_numpy and forecast_aggregation.np is None:
+                continue
+            with self.subTest(use_numpy=use_numpy):
+                aggregator = ForecastAggregator(use_numpy=use_numpy)
+                batched = aggregator.aggregate_many(payloads)
+                self.assertEqual([as_rows(f) for f in batched], [reference_daily(p) for p in payloads])
+
+    @unittest.skipIf(forecast_aggregation.np is None, "NumPy is not installed")
+    def test_default_path_depends_on_step_count(self):
+        aggregator = ForecastAggregator()
+        single = make_payload(0)
+        batch = [make_payload(utc_offset, seed=utc_offset) for utc_offset in UTC_OFFSETS]
+        with mock.patch.object(aggregator, "_aggregate_numpy", wraps=aggregator._aggregate_numpy) as vectorized:
+            self.assertRowsEqual(as_rows(aggregator.aggregate(single)), reference_daily(single))
+            vectorized.assert_not_called()
+            self.assertEqual([as_rows(f) for f in aggregator.aggregate_many(batch)], [reference_daily(p) for p in batch])
+            vectorized.assert_called_once()
+
+    def test_series_only_on_request_and_same_on_both_paths(self):
+        payloads = [make_payload(utc_offset, seed=utc_offset) for utc_offset in UTC_OFFSETS]
+        self.assertIsNone(ForecastAggregator().aggregate(payloads[0]).series)
+        expected = [ForecastSeries.from_steps(p["list"], p["city"]["timezone"]) for p in payloads]
+        for use_numpy in (False, True):
+            if use_numpy and forecast_aggregation.np is None:
+                continue
+            with self.subTest(use_numpy=use_numpy):
+                aggregator = ForecastAggregator(use_numpy=use_numpy, include_series=True)
+                self.assertEqual([f.series for f in aggregator.aggregate_many(payloads)], expected)
+
+    def test_mode_ties_go_to_first_appearance(self):
+        # One local day with every condition appearing twice, in different orders
+        for order in ([0, 1, 2, 3, 3, 2, 1, 0], [2, 0, 1, 3, 0, 1, 2, 3], [3, 3, 1, 1, 0, 0, 2, 2]):
+            payload = make_payload(0, steps=len(order), step_seconds=60)
+            for item, condition in zip(payload["list"], order):
+                description, icon = CONDITIONS[condition]
+                item["weather"] = [{"description": description, "icon": icon}]
+            expected = reference_daily(payload)
+            for use_numpy in (False, True):
+                if use_numpy and forecast_aggregation.np is None:
+                    continue
+                with self.subTest(order=order, use_numpy=use_numpy):
+                    self.assertRowsEqual(as_rows(ForecastAggregator(use_numpy=use_numpy).aggregate(payload)), expected)
+                    self.assertEqual(expected[0][4], CONDITIONS[order[0]][0].capitalize())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import pty
+import select
+import sys
+import tempfile
+import time
+import unittest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@unittest.skipUnless(sys.platform != "win32", "needs a pseudo-terminal")
+class InteractivePromptTest(unittest.TestCase):
+    """
+    Drives main.py's interactive prompt through a pseudo-terminal, the way a user would.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = dict(
+            os.environ,
+            OPENWEATHER_API_KEY="test-key",
+            WEATHER_CACHE_PATH=os.path.join(self.tmp.name, "responses.sqlite3"),
+            WEATHER_CITY_INDEX=os.path.join(self.tmp.name, "missing.idx"),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _spawn(self):
+        pid, fd = pty.fork()
+        if pid == 0:
+            os.chdir(REPO)
+            os.execve(sys.executable, [sys.executable, "main.py"], self.env)
+        return pid, fd
+
+    def _read_until(self, fd, marker: bytes, timeout: float = 10.0) -> bytes:
+        output = b""
+        deadline = time.monotonic() + timeout
+        while marker not in output:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.fail(f"timed out waiting for {marker!r}; got {output!r}")
+            if select.select([fd], [], [], remaining)[0]:
+                try:
+                    output += os.read(fd, 4096)
+                except OSError:
+                    break
+        return output
+
+    def _wait_exit(self, pid, fd, timeout: float = 5.0) -> int:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # Drain output so the child never blocks writing to the terminal
+            if select.select([fd], [], [], 0.05)[0]:
+                try:
+                    os.read(fd, 4096)
+                except OSError:
+                    pass
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                os.close(fd)
+                return os.waitstatus_to_exitcode(status)
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+        os.close(fd)
+        self.fail("process did not exit")
+
+    def test_ctrl_c_at_prompt_exits_immediately(self):
+        pid, fd = self._spawn()
+        self._read_until(fd, b"Enter city name")
+        os.write(fd, b"\x03")
+        self.assertEqual(self._wait_exit(pid, fd), 130)
+
+    def test_eof_at_prompt_exits_cleanly(self):
+        pid, fd = self._spawn()
+        self._read_until(fd, b"Enter city name")
+        os.write(fd, b"\x04")
+        self.assertEqual(self._wait_exit(pid, fd), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,291 @@
+import asyncio
+import io
+import unittest
+from collections import Counter
+from typing import Dict, Optional
+
+import httpx
+from rich.console import Console
+
+import main
+from weather_api import WeatherAPI
+from weather_cache import ResponseCache
+from weather_display import WeatherDisplay
+from weather_resilience import CircuitBreaker, RetryPolicy
+
+CURRENT = {
+    "name": "London",
+    "sys": {"country": "GB"},
+    "main": {"temp": 11.5, "feels_like": 10.0, "humidity": 80, "pressure": 1012},
+    "weather": [{"description": "light rain", "icon": "10d"}],
+    "wind": {"speed": 4.1},
+}
+FORECAST = {
+    "city": {"name": "London", "country": "GB", "timezone": 0},
+    "list": [
+        {"dt": 1700000000 + i * 10800, "main": {"temp": 8.0 + i}, "weather": [{"description": "clear sky", "icon": "01d"}]}
+        for i in range(8)
+    ],
+}
+PAYLOADS = {"weather": CURRENT, "forecast": FORECAST}
+
+
+class Upstream:
+    """
+    Fake OpenWeatherMap behind an httpx.MockTransport: counts requests per endpoint
+    and answers after `latency` seconds with `status` (200 serves the canned payload).
+    """
+
+    def __init__(self, latency: float = 0.0, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.latency = latency
+        self.status = status
+        self.headers = headers or {}
+        self.calls = Counter()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        self.calls[endpoint] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return httpx.Response(self.status, headers=self.headers, json={"message": "upstream error"})
+        return httpx.Response(200, json=PAYLOADS[endpoint])
+
+
+def make_api(upstream: Upstream, **kwargs) -> WeatherAPI:
+    """
+    Creates a WeatherAPI whose requests are answered by `upstream`.
+    """
+    api = WeatherAPI("test-key", **kwargs)
+    api.client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    return api
+
+
+class RecordingDisplay(WeatherDisplay):
+    """
+    Counts the rows the watch loop renders, i.e. completed refreshes.
+    """
+
+    def __init__(self, console):
+        super().__init__(console)
+        self.refreshes = 0
+
+    def watch_row(self, report):
+        self.refreshes += 1
+        return super().watch_row(report)
+
+
+class WatchRefreshTest(unittest.TestCase):
+
+    def test_one_upstream_fetch_per_tick(self):
+        upstream = Upstream(latency=0.05)
+        quiet = Console(file=io.StringIO())
+        display = RecordingDisplay(quiet)
+
+        async def watch():
+            async with make_api(upstream, cache=ResponseCache()) as api:
+                try:
+                    await asyncio.wait_for(main.run_watch(api, display, ["London"], interval=0.5), 1.75)
+                except asyncio.TimeoutError:
+                    pass
+
+        saved_console, main.console = main.console, quiet
+        try:
+            asyncio.run(watch())
+        finally:
+            main.console = saved_console
+
+        self.assertEqual(display.refreshes, 4)
+        # A response cached by the previous tick must not stand in for this tick's refresh
+        self.assertEqual(upstream.calls["weather"], display.refreshes)
+        self.assertEqual(upstream.calls["forecast"], display.refreshes)
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_retry_after_beyond_backoff_max_stops_retrying(self):
+        upstream = Upstream(status=503, headers={"Retry-After": "120"})
+
+        async def fetch():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=3, backoff_max=5.0)) as api:
+                return await asyncio.wait_for(api.get_current_weather("London"), 1.0), api.metrics.retries
+
+        self.assertEqual(asyncio.run(fetch()), (None, 0))
+        self.assertEqual(upstream.calls["weather"], 1)
+
+    def test_throttling_does_not_open_the_breaker(self):
+        upstream = Upstream(status=429)
+
+        async def fetch():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=1), breaker_failure_threshold=2) as api:
+                for _ in range(5):
+                    await api.get_current_weather("London")
+                return api._breakers["weather"].state
+
+        self.assertEqual(asyncio.run(fetch()), CircuitBreaker.CLOSED)
+        self.assertEqual(upstream.calls["weather"], 5)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_open_breaker_fails_fast(self):
+        upstream = Upstream(status=503)
+
+        async def fetch():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=1), breaker_failure_threshold=2) as api:
+                results = [await api.get_current_weather("London") for _ in range(4)]
+                return results, api._breakers["weather"].state, api.metrics.short_circuited
+
+        self.assertEqual(asyncio.run(fetch()), ([None] * 4, CircuitBreaker.OPEN, 2))
+        self.assertEqual(upstream.calls["weather"], 2)
+
+    def test_half_open_lets_one_probe_through(self):
+        upstream = Upstream(status=500, latency=0.02)
+
+        async def fetch():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=1),
+                                breaker_failure_threshold=1, breaker_reset_timeout=0.05) as api:
+                await api.get_current_weather("London")
+                await asyncio.sleep(0.06)
+                upstream.status = 200
+                # Different cities, so the requests aren't coalesced into one
+                probes = await asyncio.gather(*(api.get_current_weather(city) for city in ("London", "Paris", "Rome")))
+                return probes, api._breakers["weather"].state, await api.get_current_weather("Oslo")
+
+        probes, state, after = asyncio.run(fetch())
+        self.assertEqual(sum(probe is not None for probe in probes), 1)
+        self.assertEqual(state, CircuitBreaker.CLOSED)
+        self.assertIsNotNone(after)
+        self.assertEqual(upstream.calls["weather"], 3)
+
+    def test_failed_probe_reopens(self):
+        upstream = Upstream(status=500)
+
+        async def fetch():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=1),
+                                breaker_failure_threshold=1, breaker_reset_timeout=0.05) as api:
+                await api.get_current_weather("London")
+                await asyncio.sleep(0.06)
+                await api.get_current_weather("London") # The probe fails
+                await api.get_current_weather("London")
+                return api._breakers["weather"].state
+
+        self.assertEqual(asyncio.run(fetch()), CircuitBreaker.OPEN)
+        self.assertEqual(upstream.calls["weather"], 2)
+
+    def test_cancelled_probe_is_reclaimed(self):
+        upstream = Upstream(status=500)
+        cancel_next = False
+
+        async def handler(request):
+            if cancel_next:
+                raise asyncio.CancelledError # The probe never reports back
+            return await upstream(request)
+
+        async def fetch():
+            nonlocal cancel_next
+            api = WeatherAPI("test-key", retry_policy=RetryPolicy(max_attempts=1),
+                             breaker_failure_threshold=1, breaker_reset_timeout=0.05)
+            api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with api:
+                await api.get_current_weather("London")
+                await asyncio.sleep(0.06)
+                cancel_next = True
+                with self.assertRaises(asyncio.CancelledError):
+                    await api.get_current_weather("London")
+                cancel_next = False
+                upstream.status = 200
+                blocked = await api.get_current_weather("London") # The probe slot is still taken
+                await asyncio.sleep(0.06)
+                return blocked, await api.get_current_weather("London"), api._breakers["weather"].state
+
+        blocked, reclaimed, state = asyncio.run(fetch())
+        self.assertIsNone(blocked)
+        self.assertIsNotNone(reclaimed)
+        self.assertEqual(state, CircuitBreaker.CLOSED)
+
+    def test_open_breaker_serves_stale_cache(self):
+        for serve_stale in (True, False):
+            with self.subTest(serve_stale_on_open=serve_stale):
+                upstream = Upstream()
+
+                async def fetch():
+                    async with make_api(upstream, cache=ResponseCache(ttls={"weather": 0}),
+                                        retry_policy=RetryPolicy(max_attempts=1), breaker_failure_threshold=1,
+                                        serve_stale_on_open=serve_stale) as api:
+                        await api.get_current_weather("London")
+                        upstream.status = 503
+                        await api.get_current_weather("London") # Opens the breaker
+                        return await api.get_current_weather("London"), api.metrics.stale_served
+
+                current, stale_served = asyncio.run(fetch())
+                self.assertEqual(current is not None, serve_stale)
+                self.assertEqual(stale_served, int(serve_stale))
+                self.assertEqual(upstream.calls["weather"], 2)
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def test_identical_requests_share_one_fetch(self):
+        upstream = Upstream(latency=0.05)
+
+        async def fetch():
+            async with make_api(upstream) as api:
+                results = await asyncio.gather(*(api.get_current_weather("London") for _ in range(5)))
+                return results, api.metrics.coalesced
+
+        results, coalesced = asyncio.run(fetch())
+        self.assertTrue(all(result is not None for result in results))
+        self.assertEqual(coalesced, 4)
+        self.assertEqual(upstream.calls["weather"], 1)
+
+    def test_cancelled_waiter_does_not_cancel_the_shared_fetch(self):
+        upstream = Upstream(latency=0.05)
+
+        async def fetch():
+            async with make_api(upstream) as api:
+                waiters = [asyncio.create_task(api.get_current_weather("London")) for _ in range(3)]
+                await asyncio.sleep(0.01)
+                waiters[0].cancel()
+                return await asyncio.gather(*waiters[1:])
+
+        self.assertTrue(all(result is not None for result in asyncio.run(fetch())))
+        self.assertEqual(upstream.calls["weather"], 1)
+
+
+class StaleWhileRevalidateTest(unittest.TestCase):
+
+    def test_stale_entry_is_served_and_refreshed_in_background(self):
+        upstream = Upstream(latency=0.02)
+
+        async def fetch():
+            async with make_api(upstream, cache=ResponseCache(ttls={"weather": 0}),
+                                stale_while_revalidate={"weather": 60}) as api:
+                await api.get_current_weather("London")
+                stale = await api.get_current_weather("London")
+                calls_on_return = upstream.calls["weather"]
+                await asyncio.sleep(0.05)
+                return stale, calls_on_return, api.metrics.stale_served
+
+        stale, calls_on_return, stale_served = asyncio.run(fetch())
+        self.assertIsNotNone(stale)
+        self.assertEqual(calls_on_return, 1) # Answered before the refresh went out
+        self.assertEqual(stale_served, 1)
+        self.assertEqual(upstream.calls["weather"], 2)
+
+    def test_entry_past_the_hard_ttl_waits_for_fresh_data(self):
+        upstream = Upstream()
+
+        async def fetch():
+            async with make_api(upstream, cache=ResponseCache(ttls={"weather": 0}),
+                                stale_while_revalidate={"weather": 0}) as api:
+                await api.get_current_weather("London")
+                await asyncio.sleep(0.01)
+                await api.get_current_weather("London")
+                return upstream.calls["weather"], api.metrics.stale_served
+
+        self.assertEqual(asyncio.run(fetch()), (2, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
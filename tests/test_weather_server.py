@@ -0,0 +1,149 @@
+import asyncio
+import json
+import socket
+import unittest
+
+from test_weather_api import Upstream, make_api
+from weather_resilience import RetryPolicy
+from weather_server import WeatherServer
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def read_response(reader: asyncio.StreamReader):
+    """
+    Reads one HTTP response; returns (status, lower-case headers, body).
+    The body is delimited by Content-Length, chunked encoding or end of stream.
+    """
+    head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    status = int(head[0].split(" ")[1])
+    headers = {}
+    for line in head[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        body = b""
+        while True:
+            size = int(await reader.readuntil(b"\r\n"), 16)
+            chunk = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            body += chunk[:-2]
+    else:
+        body = await reader.read()
+    return status, headers, body
+
+
+class WeatherServerTest(unittest.TestCase):
+    """
+    Talks to a running WeatherServer over raw sockets, with the upstream mocked.
+    """
+
+    def exchange(self, upstream: Upstream, *requests: bytes):
+        """
+        Sends the requests on one connection and reads one response per request.
+        Also returns whether the server then closed the connection.
+        """
+        port = free_port()
+
+        async def run():
+            async with make_api(upstream, retry_policy=RetryPolicy(max_attempts=1)) as api:
+                server = asyncio.create_task(WeatherServer(api).serve("127.0.0.1", port))
+                try:
+                    for _ in range(100):
+                        try:
+                            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                            break
+                        except OSError:
+                            await asyncio.sleep(0.01)
+                    writer.write(b"".join(requests))
+                    await writer.drain()
+                    results = [await read_response(reader) for _ in requests]
+                    closed = await asyncio.wait_for(reader.read(), 1.0) == b""
+                    writer.close()
+                    return results, closed
+                finally:
+                    server.cancel()
+
+        return asyncio.run(run())
+
+    def test_current_weather(self):
+        [(status, headers, body)], closed = self.exchange(
+            Upstream(), b"GET /current?city=London HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-type"], "application/json")
+        self.assertEqual(json.loads(body)["city"], "London")
+        self.assertTrue(closed)
+
+    def test_keep_alive_serves_several_requests_per_connection(self):
+        results, closed = self.exchange(
+            Upstream(),
+            b"GET /current?city=London HTTP/1.1\r\n\r\n",
+            b"GET /forecast?city=London HTTP/1.1\r\nConnection: close\r\n\r\n",
+        )
+        self.assertEqual([status for status, _, _ in results], [200, 200])
+        self.assertEqual(results[0][1]["connection"], "keep-alive")
+        self.assertTrue(json.loads(results[1][2])["daily"])
+        self.assertTrue(closed)
+
+    def test_unknown_city_is_not_found(self):
+        for path in (b"/current", b"/forecast"):
+            with self.subTest(path=path):
+                [(status, _, body)], _ = self.exchange(
+                    Upstream(status=404), b"GET %s?city=Atlantis HTTP/1.1\r\nConnection: close\r\n\r\n" % path)
+                self.assertEqual(status, 404)
+                self.assertIn("Atlantis", json.loads(body)["error"])
+
+    def test_upstream_failure_is_bad_gateway(self):
+        [(status, _, _)], _ = self.exchange(
+            Upstream(status=500), b"GET /current?city=London HTTP/1.1\r\nConnection: close\r\n\r\n")
+        self.assertEqual(status, 502)
+
+    def test_request_errors(self):
+        cases = [
+            (b"GARBAGE\r\n\r\n", 400),
+            (b"GET /current?city=London HTTP/2.0\r\n\r\n", 505),
+            (b"GET /current HTTP/1.1\r\nConnection: close\r\n\r\n", 400),
+            (b"GET /nowhere HTTP/1.1\r\nConnection: close\r\n\r\n", 404),
+            (b"POST /current?city=London HTTP/1.1\r\nConnection: close\r\n\r\n", 405),
+            (b"POST /batch HTTP/1.1\r\nContent-Length: 8\r\nConnection: close\r\n\r\nnot json", 400),
+        ]
+        for request, expected in cases:
+            with self.subTest(request=request):
+                [(status, _, body)], closed = self.exchange(Upstream(), request)
+                self.assertEqual(status, expected)
+                self.assertIn("error", json.loads(body))
+                self.assertTrue(closed)
+
+    def test_batch_streams_chunked_ndjson(self):
+        payload = b'{"cities": ["Rome"]}'
+        results, closed = self.exchange(
+            Upstream(), b"GET /batch?city=London&city=Paris HTTP/1.1\r\n\r\n",
+            b"POST /batch HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(payload), payload),
+        )
+        for (status, headers, ndjson), cities in zip(results, (["London", "Paris"], ["Rome"])):
+            records = [json.loads(line) for line in ndjson.decode("utf-8").splitlines()]
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["transfer-encoding"], "chunked")
+            self.assertEqual(sorted(record["query"] for record in records), cities)
+            self.assertTrue(all(record["current"] and record["forecast"] for record in records))
+        self.assertTrue(closed)
+
+    def test_batch_over_http_1_0_ends_by_closing(self):
+        [(status, headers, body)], closed = self.exchange(
+            Upstream(), b"GET /batch?city=London&city=Paris HTTP/1.0\r\nConnection: keep-alive\r\n\r\n")
+        self.assertEqual(status, 200)
+        self.assertNotIn("transfer-encoding", headers)
+        self.assertEqual(headers["connection"], "close")
+        self.assertEqual(len(body.splitlines()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
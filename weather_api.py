@@ -1,7 +1,20 @@
 import httpx # Use httpx for async requests
+import asyncio
+import importlib.util
 import os
-from typing import Optional, Dict, Any, List
-from weather_data import WeatherData, ForecastData, DailyForecast
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Iterable, AsyncIterable, AsyncIterator, List, Union, Tuple
+from weather_data import WeatherData, ForecastData, CityReport
+from weather_cache import ResponseCache, make_cache_key
+from forecast_aggregation import ForecastAggregator
+from weather_json import loads, parse_current_weather
+from weather_limits import RateLimiter
+from weather_metrics import APIMetrics
+from weather_resilience import RetryPolicy, CircuitBreaker
+from weather_geocode import CityResolver, Location
+
+# HTTP status of the upstream's answer to the current task's last failed request
+_error_status: ContextVar[Optional[int]] = ContextVar("weather_api_error_status", default=None)
 
 class WeatherAPI:
     """
@@ -9,130 +22,450 @@ class WeatherAPI:
     Fetches current weather and 5-day forecast data.
     """
     BASE_URL = "https://api.openweathermap.org/data/2.5/"
+    GEO_URL = "https://api.openweathermap.org/geo/1.0/"
+    DEFAULT_CONCURRENCY = 20 # Max cities fetched at once by get_many
+    PREFETCH_RESERVE = 10 # Rate-limiter calls left for user requests before prefetching pauses
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        cache: Optional[ResponseCache] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker_failure_threshold: Optional[int] = 5,
+        breaker_reset_timeout: float = 30.0,
+        serve_stale_on_open: bool = True,
+        stale_while_revalidate: Optional[Dict[str, float]] = None,
+        resolver: Optional[CityResolver] = None,
+    ):
         """
         Initializes the WeatherAPI client with the API key.
+        Use it as an async context manager (`async with WeatherAPI(...) as api:`)
+        or call aclose() so the connection pool is shut down cleanly.
         Args:
             api_key (str): Your OpenWeatherMap API key.
+            cache (Optional[ResponseCache]): Cache for raw responses. When omitted,
+                every call goes to the network.
+            max_connections (int): Maximum number of open connections in the pool.
+            max_keepalive_connections (int): Maximum number of idle connections kept alive for reuse.
+            keepalive_expiry (float): Seconds an idle connection is kept before being closed.
+            http2 (bool): Multiplex requests over HTTP/2. Requires the `h2` package
+                (`pip install httpx[http2]`); falls back to HTTP/1.1 if it is missing.
+            rate_limiter (Optional[RateLimiter]): Limiter that queues requests to stay
+                within the plan's quota. When omitted, requests are not throttled.
+            retry_policy (Optional[RetryPolicy]): How transient failures are retried.
+                Defaults to RetryPolicy(); pass RetryPolicy(max_attempts=1) to disable retries.
+            breaker_failure_threshold (Optional[int]): Consecutive failures after which an
+                endpoint's circuit breaker opens, or None to disable circuit breaking.
+            breaker_reset_timeout (float): Seconds an open breaker waits before probing again.
+            serve_stale_on_open (bool): While a breaker is open, answer from expired cache
+                entries when available instead of returning None.
+            stale_while_revalidate (Optional[Dict[str, float]]): Per-endpoint seconds past
+                the cache TTL during which an expired entry is returned immediately while
+                it is refreshed in the background. Beyond that window (the hard TTL) callers
+                wait for fresh data. Endpoints not listed never serve stale data this way.
+            resolver (Optional[CityResolver]): Resolves city names to coordinates or city
+                IDs, geocoding each name once, so weather requests are location-based.
+                When omitted, requests query by name.
         """
         self.api_key = api_key
-        # Initialize an asynchronous HTTP client
-        self.client = httpx.AsyncClient()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.metrics = APIMetrics()
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.serve_stale_on_open = serve_stale_on_open
+        self._breakers: Dict[str, CircuitBreaker] = {} # One per endpoint
+        self.stale_while_revalidate = stale_while_revalidate or {}
+        self.forecast_aggregator = ForecastAggregator()
+        self.resolver = resolver
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1.")
+            http2 = False
+        # Initialize an asynchronous HTTP client with a shared, bounded connection pool
+        self.client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        # Requests currently on the wire, keyed by cache key, so identical
+        # concurrent queries share one HTTP round trip
+        self._in_flight: Dict[str, "asyncio.Future[Tuple[Optional[Any], Optional[int]]]"] = {}
+        self._prefetch_task: Optional["asyncio.Task[None]"] = None
+        self._resolver_flush: Optional["asyncio.Future[None]"] = None
+
+    async def __aenter__(self) -> "WeatherAPI":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
 
-    async def _make_request(self, endpoint: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def aclose(self) -> None:
+        """
+        Closes the HTTP client and its connection pool, cancelling background refreshes
+        and saving newly resolved city names.
+        """
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+        for in_flight in list(self._in_flight.values()):
+            in_flight.cancel()
+        if self.resolver is not None:
+            if self._resolver_flush is not None:
+                await self._resolver_flush
+            await asyncio.to_thread(self.resolver.flush)
+        await self.client.aclose()
+
+    async def _make_request(self, endpoint: str, params: Dict[str, Any], base_url: Optional[str] = None,
+                            min_fetched_at: Optional[float] = None) -> Optional[Any]:
         """
         Internal helper to make an asynchronous HTTP GET request to the API.
         Args:
             endpoint (str): The API endpoint (e.g., "weather", "forecast").
             params (Dict[str, Any]): Dictionary of query parameters.
+            base_url (Optional[str]): API root to use instead of BASE_URL (e.g. GEO_URL).
+            min_fetched_at (Optional[float]): Only use a cached response fetched at or after
+                this Unix time (and never a stale one); older entries are fetched again.
         Returns:
-            Optional[Dict[str, Any]]: JSON response data if successful, None otherwise.
+            Optional[Any]: JSON response data if successful, None otherwise.
         """
-        full_url = f"{self.BASE_URL}{endpoint}"
+        _error_status.set(None)
+        full_url = f"{base_url or self.BASE_URL}{endpoint}"
         # Add common parameters
         params.update({"appid": self.api_key, "units": "metric"}) # Use metric units by default
 
-        try:
-            response = await self.client.get(full_url, params=params, timeout=10)
-            response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
-            return response.json()
-        except httpx.RequestError as e:
-            print(f"Network error during request to {e.request.url}: {e}")
+        cache_key = make_cache_key(endpoint, params)
+        if self.cache is not None:
+            entry = self.cache.peek(cache_key)
+            if entry is not None and (min_fetched_at is None or entry.fetched_at >= min_fetched_at):
+                if entry.is_fresh():
+                    self.metrics.cache_hits += 1
+                    return entry.payload
+                stale_window = self.stale_while_revalidate.get(endpoint)
+                if min_fetched_at is None and stale_window is not None and entry.age() < self.cache.ttl_for(endpoint) + stale_window:
+                    # Past the soft TTL but within the hard TTL: answer now, refresh in the background
+                    self._start_fetch(endpoint, full_url, params, cache_key)
+                    self.metrics.stale_served += 1
+                    return entry.payload
+
+        # Coalesce with an identical request that is already in flight
+        if cache_key in self._in_flight:
+            self.metrics.coalesced += 1
+        in_flight = self._start_fetch(endpoint, full_url, params, cache_key)
+        # Shield the shared request so one cancelled waiter doesn't cancel it for the others
+        data, error_status = await asyncio.shield(in_flight)
+        if data is None:
+            _error_status.set(error_status)
+        return data
+
+    def last_error_status(self) -> Optional[int]:
+        """
+        Returns the HTTP status the upstream answered the calling task's most recent failed
+        request with (e.g. 404 for an unknown city), or None if that request succeeded or
+        failed without a response: a network error, an open circuit breaker or a bad payload.
+        """
+        return _error_status.get()
+
+    def _start_fetch(self, endpoint: str, full_url: str, params: Dict[str, Any], cache_key: str) -> "asyncio.Future[Tuple[Optional[Any], Optional[int]]]":
+        """
+        Returns the in-flight request for a cache key, starting one if there is none.
+        The request runs as its own task, so it completes even if nobody awaits it.
+        """
+        in_flight = self._in_flight.get(cache_key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self._fetch(endpoint, full_url, params, cache_key))
+            self._in_flight[cache_key] = in_flight
+            in_flight.add_done_callback(lambda _: self._in_flight.pop(cache_key, None))
+        return in_flight
+
+    def _breaker_for(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """
+        Returns the circuit breaker for an endpoint, creating it on first use.
+        """
+        if self.breaker_failure_threshold is None:
             return None
-        except httpx.HTTPStatusError as e:
-            print(f"HTTP error for {e.request.url}: {e.response.status_code} - {e.response.text}")
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(self.breaker_failure_threshold, self.breaker_reset_timeout)
+            self._breakers[endpoint] = breaker
+        return breaker
+
+    def _fail_fast(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Answers a request rejected by an open circuit breaker, from stale cache if allowed.
+        """
+        self.metrics.short_circuited += 1
+        if self.serve_stale_on_open and self.cache is not None:
+            entry = self.cache.peek(cache_key)
+            if entry is not None:
+                self.metrics.stale_served += 1
+                return entry.payload
+        self.metrics.failures += 1
+        return None
+
+    async def _fetch(self, endpoint: str, full_url: str, params: Dict[str, Any], cache_key: str) -> Tuple[Optional[Any], Optional[int]]:
+        """
+        Performs the HTTP request behind _make_request and stores the result in the cache.
+        Args:
+            endpoint (str): The API endpoint (e.g., "weather", "forecast").
+            full_url (str): The complete request URL.
+            params (Dict[str, Any]): Query parameters, including the API key.
+            cache_key (str): Key under which to cache the response.
+        Returns:
+            Tuple[Optional[Any], Optional[int]]: JSON response data if successful (None otherwise),
+                and the HTTP status of the last failed response, if there was one.
+        """
+        policy = self.retry_policy
+        breaker = self._breaker_for(endpoint)
+        error_status: Optional[int] = None
+        for attempt in range(1, policy.max_attempts + 1):
+            if breaker is not None and not breaker.allow_request():
+                return self._fail_fast(cache_key), None
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire() # Queue rather than hit the upstream 429
+
+            failed_response: Optional[httpx.Response] = None
+            try:
+                self.metrics.requests += 1
+                response = await self.client.get(full_url, params=params, timeout=10)
+                response.raise_for_status() # Raise an exception for bad status codes (4xx or 5xx)
+                data = loads(response.content) # Decode bytes with the fastest available JSON backend
+                if breaker is not None:
+                    breaker.record_success()
+                if self.cache is not None:
+                    self.cache.set(cache_key, endpoint, data)
+                return data, None
+            except httpx.RequestError as e:
+                # Network errors and timeouts are always worth another attempt
+                error_status = None
+                self._record_upstream_failure(endpoint, breaker)
+                if attempt == policy.max_attempts:
+                    print(f"Network error during request to {e.request.url}: {e}")
+                    break
+            except httpx.HTTPStatusError as e:
+                error_status = e.response.status_code
+                if policy.is_retryable_status(e.response.status_code) and e.response.status_code != 429:
+                    self._record_upstream_failure(endpoint, breaker)
+                elif breaker is not None:
+                    # e.g. 404: the upstream is healthy, the query is not; 429: it is healthy, we are over quota
+                    breaker.record_success()
+                if attempt == policy.max_attempts or not policy.is_retryable_status(e.response.status_code):
+                    print(f"HTTP error for {e.request.url}: {e.response.status_code} - {e.response.text}")
+                    break
+                failed_response = e.response
+            except Exception as e:
+                # e.g. an unparseable body; count it against the endpoint but don't retry
+                error_status = None
+                self._record_upstream_failure(endpoint, breaker)
+                print(f"An unexpected error occurred: {e}")
+                break
+
+            delay = policy.delay_for(attempt, failed_response)
+            if delay is None:
+                print(f"Not retrying {full_url}: the server asked to wait longer than {policy.backoff_max:.0f}s.")
+                break
+            self.metrics.retries += 1
+            await asyncio.sleep(delay)
+
+        self.metrics.failures += 1
+        return None, error_status
+
+    def _record_upstream_failure(self, endpoint: str, breaker: Optional[CircuitBreaker]) -> None:
+        """
+        Records a network error or server-side failure against an endpoint's breaker.
+        """
+        if breaker is not None and breaker.record_failure():
+            print(f"Circuit breaker opened for '{endpoint}'; failing fast for {self.breaker_reset_timeout:.0f}s.")
+
+    async def resolve_city(self, city_name: str) -> Optional[Location]:
+        """
+        Resolves a city name to a Location, using the resolver's cache when possible
+        and the OpenWeatherMap geocoding API otherwise.
+        Args:
+            city_name (str): The name of the city, optionally with ",country".
+        Returns:
+            Optional[Location]: The location, or None if the name could not be resolved.
+        """
+        if self.resolver is None:
+            return None
+        location = self.resolver.lookup(city_name)
+        if location is not None:
+            return location
+
+        data = await self._make_request("direct", {"q": city_name, "limit": 1}, base_url=self.GEO_URL)
+        if not data:
             return None
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+        try:
+            match = data[0]
+            location = Location(name=match['name'], country=match.get('country', ''), lat=match['lat'], lon=match['lon'])
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Error parsing geocoding data for {city_name}: {e}")
             return None
+        self.resolver.store(city_name, location)
+        # Save new names every so often, off the event loop, rather than once per name
+        if self.resolver.flush_due() and (self._resolver_flush is None or self._resolver_flush.done()):
+            self._resolver_flush = asyncio.ensure_future(asyncio.to_thread(self.resolver.flush))
+        return location
 
-    async def get_current_weather(self, city_name: str) -> Optional[WeatherData]:
+    async def _location_params(self, city_name: str) -> Dict[str, Any]:
+        """
+        Returns the query parameters identifying a city: its resolved ID or coordinates
+        when a resolver is configured, otherwise (or if resolving fails) its name.
+        """
+        location = await self.resolve_city(city_name)
+        if location is not None:
+            return location.to_params()
+        return {"q": city_name}
+
+    async def get_current_weather(self, city_name: str, min_fetched_at: Optional[float] = None) -> Optional[WeatherData]:
         """
         Fetches current weather data for a given city.
         Args:
             city_name (str): The name of the city.
+            min_fetched_at (Optional[float]): Oldest fetch time (Unix time) of a cached response to accept.
         Returns:
             Optional[WeatherData]: A WeatherData object if successful, None otherwise.
         """
-        params = {"q": city_name}
-        data = await self._make_request("weather", params)
+        params = await self._location_params(city_name)
+        data = await self._make_request("weather", params, min_fetched_at=min_fetched_at)
 
         if data:
             try:
                 # Extract relevant information and create a WeatherData object
-                return WeatherData(
-                    city=data['name'],
-                    country=data['sys']['country'],
-                    temperature=data['main']['temp'],
-                    feels_like=data['main']['feels_like'],
-                    humidity=data['main']['humidity'],
-                    description=data['weather'][0]['description'].capitalize(),
-                    icon=data['weather'][0]['icon'],
-                    wind_speed=data['wind']['speed'],
-                    pressure=data['main']['pressure']
-                )
+                return parse_current_weather(data)
             except KeyError as e:
                 print(f"Error parsing current weather data: Missing key {e} in response.")
                 return None
         return None
 
-    async def get_five_day_forecast(self, city_name: str) -> Optional[ForecastData]:
+    async def get_five_day_forecast(self, city_name: str, min_fetched_at: Optional[float] = None) -> Optional[ForecastData]:
         """
         Fetches 5-day weather forecast data for a given city (3-hour step).
         Args:
             city_name (str): The name of the city.
+            min_fetched_at (Optional[float]): Oldest fetch time (Unix time) of a cached response to accept.
         Returns:
             Optional[ForecastData]: A ForecastData object if successful, None otherwise.
         """
-        params = {"q": city_name}
-        data = await self._make_request("forecast", params)
+        params = await self._location_params(city_name)
+        data = await self._make_request("forecast", params, min_fetched_at=min_fetched_at)
 
         if data:
             try:
-                daily_forecasts: List[DailyForecast] = []
-                # Group forecast data by day to get daily min/max and average
-                # This is a simplification, as OpenWeatherMap provides 3-hour steps.
-                # We'll aggregate for a cleaner daily view.
-                forecast_by_day: Dict[str, List[Dict[str, Any]]] = {}
-
-                for item in data['list']:
-                    date = item['dt_txt'].split(' ')[0] #YYYY-MM-DD
-                    if date not in forecast_by_day:
-                        forecast_by_day[date] = []
-                    forecast_by_day[date].append(item)
-
-                for date_str, readings in forecast_by_day.items():
-                    temps = [r['main']['temp'] for r in readings]
-                    descriptions = [r['weather'][0]['description'] for r in readings]
-                    icons = [r['weather'][0]['icon'] for r in readings]
-
-                    # Find the most common description for the day
-                    from collections import Counter
-                    most_common_description = Counter(descriptions).most_common(1)[0][0].capitalize()
-                    most_common_icon = Counter(icons).most_common(1)[0][0]
-
-                    daily_forecasts.append(DailyForecast(
-                        date=date_str,
-                        min_temp=min(temps),
-                        max_temp=max(temps),
-                        avg_temp=sum(temps) / len(temps),
-                        description=most_common_description,
-                        icon=most_common_icon
-                    ))
-
-                # Sort forecasts by date
-                daily_forecasts.sort(key=lambda x: x.date)
-
-                return ForecastData(
-                    city=data['city']['name'],
-                    country=data['city']['country'],
-                    daily_forecasts=daily_forecasts
-                )
+                # Group the 3-hour steps by day for a cleaner daily view
+                return self.forecast_aggregator.aggregate(data)
             except KeyError as e:
                 print(f"Error parsing forecast data: Missing key {e} in response.")
                 return None
             except Exception as e:
                 print(f"An unexpected error occurred during forecast parsing: {e}")
                 return None
-        return None
\ No newline at end of file
+        return None
+
+    async def get_city_report(self, city_name: str, min_fetched_at: Optional[float] = None) -> CityReport:
+        """
+        Fetches current weather and 5-day forecast for a city concurrently,
+        so the total latency is that of the slower request.
+        Args:
+            city_name (str): The name of the city.
+            min_fetched_at (Optional[float]): Oldest fetch time (Unix time) of cached responses
+                to accept, e.g. the start of a refresh. By default the cache TTLs decide.
+        Returns:
+            CityReport: The combined report; failed parts are None.
+        """
+        current, forecast = await asyncio.gather(
+            self.get_current_weather(city_name, min_fetched_at=min_fetched_at),
+            self.get_five_day_forecast(city_name, min_fetched_at=min_fetched_at),
+        )
+        return CityReport(city=city_name, current=current, forecast=forecast)
+
+    def prefetch(self, cities: Iterable[Union[str, Location]]) -> None:
+        """
+        Warms the cache with current weather and forecasts for cities the user is
+        likely to ask for next, in the background. Cities are fetched one at a time
+        and cached responses are not requested again. A new call replaces a prefetch
+        that is still running. Does nothing without a cache.
+        Args:
+            cities (Iterable[Union[str, Location]]): City names, or already resolved Locations.
+        """
+        if self.cache is None:
+            return
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+        self._prefetch_task = asyncio.create_task(self._prefetch(list(cities)))
+
+    def _can_prefetch(self) -> bool:
+        # Leave the remaining quota to requests the user is waiting for
+        return self.rate_limiter is None or self.rate_limiter.headroom() >= self.PREFETCH_RESERVE
+
+    async def _prefetch(self, cities: List[Union[str, Location]]) -> None:
+        for city in cities:
+            if not self._can_prefetch():
+                return
+            params = city.to_params() if isinstance(city, Location) else await self._location_params(city)
+            for endpoint in ("weather", "forecast"):
+                if not self._can_prefetch():
+                    return
+                await self._make_request(endpoint, dict(params))
+
+    async def get_many(
+        self, cities: Union[Iterable[str], AsyncIterable[str]], concurrency: int = DEFAULT_CONCURRENCY
+    ) -> AsyncIterator[CityReport]:
+        """
+        Fetches current weather and forecast for many cities concurrently.
+        At most `concurrency` cities are in flight at any time, and `cities` is consumed
+        lazily, so it may be a generator over a very large input or an async iterator
+        over a stream such as stdin.
+        Args:
+            cities (Union[Iterable[str], AsyncIterable[str]]): The city names to fetch.
+            concurrency (int): Maximum number of cities fetched at the same time.
+        Yields:
+            CityReport: One report per city, in completion order rather than input order.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        is_async = isinstance(cities, AsyncIterable)
+        city_iter = cities.__aiter__() if is_async else iter(cities)
+        pending: set = set()
+        # For async input, the next city is read by a task so slow input doesn't hold back results
+        reader: Optional[asyncio.Future] = None
+        exhausted = False
+        try:
+            while True:
+                # Top up the window of in-flight cities
+                if not is_async:
+                    for city_name in city_iter:
+                        pending.add(asyncio.create_task(self.get_city_report(city_name)))
+                        if len(pending) >= concurrency:
+                            break
+                elif reader is None and not exhausted and len(pending) < concurrency:
+                    reader = asyncio.ensure_future(city_iter.__anext__())
+
+                waiting = pending | {reader} if reader is not None else pending
+                if not waiting:
+                    return
+
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if reader is not None and reader in done:
+                    try:
+                        pending.add(asyncio.create_task(self.get_city_report(reader.result())))
+                    except StopAsyncIteration:
+                        exhausted = True
+                    reader = None
+                for task in done & pending:
+                    pending.discard(task)
+                    yield task.result()
+        finally:
+            # Don't leave orphaned requests behind if the caller stops iterating early
+            for task in pending:
+                task.cancel()
+            if reader is not None:
+                reader.cancel()
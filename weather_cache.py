@@ -0,0 +1,353 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterator
+from urllib.parse import urlencode
+import weather_json
+
+try:
+    import fcntl # POSIX only; used to serialize writers across processes
+except ImportError:
+    fcntl = None
+
+# Parameters that never change the response body and must not split cache entries
+_IGNORED_PARAMS = {"appid"}
+
+
+def make_cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """
+    Builds a cache key from an endpoint and its query parameters.
+    Parameter values are stripped and lowercased so spelling variants such as
+    "London" and " london" share one entry.
+    Args:
+        endpoint (str): The API endpoint (e.g., "weather", "forecast").
+        params (Dict[str, Any]): Dictionary of query parameters.
+    Returns:
+        str: A stable key such as "weather?q=london&units=metric".
+    """
+    normalized = sorted(
+        (key, str(value).strip().lower())
+        for key, value in params.items()
+        if key not in _IGNORED_PARAMS
+    )
+    return f"{endpoint}?{urlencode(normalized)}"
+
+
+@dataclass
+class CacheEntry:
+    """
+    Represents a cached API response and when it was fetched.
+    """
+    payload: Dict[str, Any]
+    fetched_at: float # Unix timestamp
+    expires_at: float # Unix timestamp
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """
+        Returns True if the entry has not yet reached its TTL.
+        """
+        return (time.time() if now is None else now) < self.expires_at
+
+    def age(self, now: Optional[float] = None) -> float:
+        """
+        Returns the age of the entry in seconds.
+        """
+        return (time.time() if now is None else now) - self.fetched_at
+
+
+class ResponseCache:
+    """
+    In-memory cache of raw API responses with per-endpoint TTLs and LRU eviction.
+    Expired entries are kept until evicted so callers can still peek at stale data.
+    """
+    # Current conditions change quickly; the 3-hour forecast changes slowly
+    DEFAULT_TTLS = {
+        "weather": 10 * 60,
+        "forecast": 3 * 60 * 60,
+        "direct": 24 * 60 * 60, # Geocoding results practically never change
+    }
+    DEFAULT_TTL = 10 * 60 # Used for endpoints without an explicit TTL
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None):
+        """
+        Initializes the cache.
+        Args:
+            max_entries (int): Maximum number of responses kept before the least
+                recently used one is evicted.
+            ttls (Optional[Dict[str, float]]): Per-endpoint TTLs in seconds, merged
+                over DEFAULT_TTLS.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def ttl_for(self, endpoint: str) -> float:
+        """
+        Returns the TTL in seconds for an endpoint.
+        """
+        return self.ttls.get(endpoint, self.DEFAULT_TTL)
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the entry for a key whether or not it has expired.
+        Args:
+            key (str): A key built by make_cache_key.
+        Returns:
+            Optional[CacheEntry]: The cached entry, or None if there is none.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached payload for a key if it is still fresh.
+        Args:
+            key (str): A key built by make_cache_key.
+        Returns:
+            Optional[Dict[str, Any]]: The cached JSON payload, or None on a miss or expiry.
+        """
+        entry = self.peek(key)
+        if entry is not None and entry.is_fresh():
+            return entry.payload
+        return None
+
+    def set(self, key: str, endpoint: str, payload: Dict[str, Any]) -> None:
+        """
+        Stores a payload, evicting the least recently used entry if the cache is full.
+        Args:
+            key (str): A key built by make_cache_key.
+            endpoint (str): The endpoint the payload came from, used to pick the TTL.
+            payload (Dict[str, Any]): The JSON response data.
+        """
+        now = time.time()
+        self._entries[key] = CacheEntry(payload=payload, fetched_at=now, expires_at=now + self.ttl_for(endpoint))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """
+        Removes all expired entries.
+        Returns:
+            int: The number of entries removed.
+        """
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if not entry.is_fresh(now)]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResponseCache:
+    """
+    Persistent cache of raw API responses stored in a SQLite database, so a restarted
+    process starts warm. Several processes on one host can share the same file:
+    SQLite handles concurrent readers, and writes are serialized with an advisory
+    lock file where the platform supports it.
+    peek() and set() run on the event loop for every request, so they never wait for
+    a lock held elsewhere (e.g. during another process's compact()): a busy cache
+    reads as a miss and the write is skipped. Maintenance calls wait as usual.
+    Implements the same interface as ResponseCache.
+    """
+    DEFAULT_TTLS = ResponseCache.DEFAULT_TTLS
+    DEFAULT_TTL = ResponseCache.DEFAULT_TTL
+    BUSY_TIMEOUT = 0.05 # Seconds peek()/set() wait on a locked database
+    MAINTENANCE_TIMEOUT = 30.0 # Seconds schema setup, purges and compaction wait
+
+    def __init__(self, path: str, ttls: Optional[Dict[str, float]] = None):
+        """
+        Opens (or creates) the cache database.
+        Args:
+            path (str): Path to the SQLite database file. Parent directories are created.
+            ttls (Optional[Dict[str, float]]): Per-endpoint TTLs in seconds, merged
+                over DEFAULT_TTLS. TTLs are applied when reading, so changing them takes
+                effect for rows that are already stored.
+        """
+        self.path = path
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock_path = f"{path}.lock"
+        self._thread_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        # WAL lets readers in other processes proceed while one process writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._write_lock():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " endpoint TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_fetched_at ON responses (fetched_at)")
+
+    @contextmanager
+    def _write_lock(self, blocking: bool = True) -> Iterator[bool]:
+        """
+        Holds an exclusive lock for the duration of a write, across threads and processes.
+        Blocking callers also get the long SQLite busy timeout for their statements.
+        With blocking=False the lock is only tried; the context yields False if it is
+        held elsewhere, and the caller must skip its write.
+        """
+        if not self._thread_lock.acquire(blocking=blocking):
+            yield False
+            return
+        try:
+            if blocking:
+                self._conn.execute(f"PRAGMA busy_timeout = {int(self.MAINTENANCE_TIMEOUT * 1000)}")
+            try:
+                if fcntl is None:
+                    yield True
+                    return
+                with open(self._lock_path, "a") as lock_file:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        yield False
+                        return
+                    try:
+                        yield True
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            finally:
+                if blocking:
+                    self._conn.execute(f"PRAGMA busy_timeout = {int(self.BUSY_TIMEOUT * 1000)}")
+        finally:
+            self._thread_lock.release()
+
+    def ttl_for(self, endpoint: str) -> float:
+        """
+        Returns the TTL in seconds for an endpoint.
+        """
+        return self.ttls.get(endpoint, self.DEFAULT_TTL)
+
+    def peek(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the entry for a key whether or not it has expired.
+        Args:
+            key (str): A key built by make_cache_key.
+        Returns:
+            Optional[CacheEntry]: The cached entry, or None if there is none.
+        """
+        if not self._thread_lock.acquire(blocking=False):
+            return None # Busy with maintenance in another thread
+        try:
+            row = self._conn.execute(
+                "SELECT endpoint, fetched_at, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None # Locked by another process for longer than BUSY_TIMEOUT
+        finally:
+            self._thread_lock.release()
+        if row is None:
+            return None
+        endpoint, fetched_at, payload = row
+        try:
+            data = weather_json.loads(payload)
+        except ValueError:
+            return None # Treat a corrupt row as a miss; the next set() overwrites it
+        return CacheEntry(payload=data, fetched_at=fetched_at, expires_at=fetched_at + self.ttl_for(endpoint))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached payload for a key if it is still fresh.
+        Args:
+            key (str): A key built by make_cache_key.
+        Returns:
+            Optional[Dict[str, Any]]: The cached JSON payload, or None on a miss or expiry.
+        """
+        entry = self.peek(key)
+        if entry is not None and entry.is_fresh():
+            return entry.payload
+        return None
+
+    def set(self, key: str, endpoint: str, payload: Dict[str, Any]) -> None:
+        """
+        Stores a payload, replacing any previous entry for the key.
+        Args:
+            key (str): A key built by make_cache_key.
+            endpoint (str): The endpoint the payload came from, used to pick the TTL.
+            payload (Dict[str, Any]): The JSON response data.
+        """
+        with self._write_lock(blocking=False) as acquired:
+            if not acquired:
+                return # Another writer holds the cache; this response just isn't cached
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, endpoint, fetched_at, payload) VALUES (?, ?, ?, ?)",
+                    (key, endpoint, time.time(), weather_json.dumps(payload)),
+                )
+            except sqlite3.OperationalError:
+                pass # Database locked by a process that doesn't use the lock file
+
+    def purge_expired(self, grace: float = 0) -> int:
+        """
+        Removes entries that expired more than `grace` seconds ago.
+        Args:
+            grace (float): Extra seconds to keep expired rows, e.g. for serving stale data.
+        Returns:
+            int: The number of entries removed.
+        """
+        now = time.time()
+        removed = 0
+        with self._write_lock():
+            endpoints = [row[0] for row in self._conn.execute("SELECT DISTINCT endpoint FROM responses")]
+            for endpoint in endpoints:
+                cutoff = now - self.ttl_for(endpoint) - grace
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE endpoint = ? AND fetched_at < ?", (endpoint, cutoff)
+                )
+                removed += cursor.rowcount
+        return removed
+
+    def compact(self, grace: float = 0) -> int:
+        """
+        Removes expired entries and reclaims their space on disk.
+        Args:
+            grace (float): Extra seconds to keep expired rows, as in purge_expired.
+        Returns:
+            int: The number of entries removed.
+        """
+        removed = self.purge_expired(grace)
+        with self._write_lock():
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.execute("VACUUM")
+        return removed
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+        """
+        with self._write_lock():
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+        """
+        with self._thread_lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._thread_lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -1,10 +1,24 @@
+import math
+import sys
+from array import array
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Dict, Any, Sequence
 
-@dataclass
+def _intern_fields(obj: object, *names: str) -> None:
+    """
+    Replaces string fields with their interned copy, so the few distinct
+    descriptions and icon codes are stored once no matter how many objects hold them.
+    Uses object.__setattr__ so it also works on frozen dataclasses.
+    """
+    for name in names:
+        object.__setattr__(obj, name, sys.intern(getattr(obj, name)))
+
+
+@dataclass(slots=True, frozen=True)
 class WeatherData:
     """
     Represents current weather conditions for a specific location.
+    Slotted and immutable, so cached instances are small and safe to share.
     """
     city: str
     country: str
@@ -16,10 +30,14 @@ class WeatherData:
     wind_speed: float
     pressure: int
 
-@dataclass
+    def __post_init__(self):
+        _intern_fields(self, "description", "icon")
+
+@dataclass(slots=True, frozen=True)
 class DailyForecast:
     """
     Represents aggregated weather forecast for a single day.
+    Slotted and immutable, so cached instances are small and safe to share.
     """
     date: str #YYYY-MM-DD
     min_temp: float
@@ -28,11 +46,137 @@ class DailyForecast:
     description: str
     icon: str # OpenWeatherMap icon code
 
-@dataclass
+    def __post_init__(self):
+        _intern_fields(self, "date", "description", "icon")
+
+def encode_icon(icon: str) -> int:
+    """
+    Packs an OpenWeatherMap icon code such as "10n" into a small int (0 if unrecognized).
+    """
+    try:
+        return int(icon[:2]) * 2 + (icon[2:] == "n")
+    except ValueError:
+        return 0
+
+
+def decode_icon(code: int) -> str:
+    """
+    Unpacks an int produced by encode_icon back into an icon code such as "10n".
+    """
+    return f"{code // 2:02d}{'n' if code % 2 else 'd'}"
+
+
+def _float_field(group: Optional[Dict[str, Any]], name: str, default: float = float("nan")) -> float:
+    """
+    Returns a numeric field of a forecast step as a float, or `default` if it is missing or not a number.
+    """
+    value = (group or {}).get(name)
+    return float(value) if isinstance(value, (int, float)) else default
+
+
+def _int_field(group: Optional[Dict[str, Any]], name: str, upper: int) -> int:
+    """
+    Returns a numeric field of a forecast step rounded and clamped to 0..upper (0 if missing).
+    """
+    value = (group or {}).get(name)
+    if not isinstance(value, (int, float)) or not math.isfinite(value):
+        return 0
+    return min(max(int(round(value)), 0), upper)
+
+
+class ForecastSeries:
+    """
+    Full-resolution 3-hour forecast steps stored column-wise in compact typed arrays.
+    Index i of every column describes the same step.
+    """
+    COLUMNS = ("timestamps", "temp", "feels_like", "humidity", "wind_speed", "pressure", "pop", "icons")
+    __slots__ = ("utc_offset",) + COLUMNS
+
+    def __init__(self, utc_offset: int = 0):
+        """
+        Initializes an empty series.
+        Args:
+            utc_offset (int): The location's offset from UTC in seconds.
+        """
+        self.utc_offset = utc_offset
+        self.timestamps = array('q') # Unix timestamps (UTC)
+        self.temp = array('f') # °C
+        self.feels_like = array('f') # °C
+        self.humidity = array('B') # %
+        self.wind_speed = array('f') # m/s
+        self.pressure = array('H') # hPa
+        self.pop = array('f') # Probability of precipitation, 0-1
+        self.icons = array('B') # Icon codes packed with encode_icon
+
+    @classmethod
+    def from_steps(cls, steps: List[Dict[str, Any]], utc_offset: int = 0,
+                   timestamps: Optional[Sequence[int]] = None, temps: Optional[Sequence[float]] = None) -> "ForecastSeries":
+        """
+        Builds a series from the raw `list` entries of a forecast response.
+        Only `dt` and `main.temp` are required. Missing float fields become NaN,
+        missing integer fields 0, and integer fields are rounded and clamped to
+        their column's range, so an unusual payload doesn't lose the whole series.
+        Args:
+            steps (List[Dict[str, Any]]): The forecast steps.
+            utc_offset (int): The location's offset from UTC in seconds.
+            timestamps (Optional[Sequence[int]]): The steps' `dt` values, if the caller already extracted them.
+            temps (Optional[Sequence[float]]): The steps' `main.temp` values, likewise.
+        Raises:
+            KeyError: If a step is missing `dt` or `main.temp`.
+        """
+        series = cls(utc_offset)
+        series.timestamps.extend(timestamps if timestamps is not None else (step['dt'] for step in steps))
+        series.temp.extend(temps if temps is not None else (step['main']['temp'] for step in steps))
+        series.feels_like.extend(_float_field(step.get('main'), 'feels_like') for step in steps)
+        series.humidity.extend(_int_field(step.get('main'), 'humidity', 0xFF) for step in steps)
+        series.wind_speed.extend(_float_field(step.get('wind'), 'speed') for step in steps)
+        series.pressure.extend(_int_field(step.get('main'), 'pressure', 0xFFFF) for step in steps)
+        series.pop.extend(_float_field(step, 'pop', 0.0) for step in steps)
+        series.icons.extend(encode_icon((step.get('weather') or [{}])[0].get('icon', '')) for step in steps)
+        return series
+
+    def icon(self, index: int) -> str:
+        """
+        Returns the OpenWeatherMap icon code of a step.
+        """
+        return decode_icon(self.icons[index])
+
+    def local_timestamp(self, index: int) -> int:
+        """
+        Returns the timestamp of a step shifted into the location's local time.
+        """
+        return self.timestamps[index] + self.utc_offset
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ForecastSeries):
+            return NotImplemented
+        return self.utc_offset == other.utc_offset and all(
+            getattr(self, column) == getattr(other, column) for column in self.COLUMNS
+        )
+
+    def __repr__(self) -> str:
+        return f"ForecastSeries(steps={len(self)}, utc_offset={self.utc_offset})"
+
+
+@dataclass(slots=True)
 class ForecastData:
     """
     Represents a collection of daily forecasts for a specific location.
     """
     city: str
     country: str
-    daily_forecasts: List[DailyForecast]
\ No newline at end of file
+    daily_forecasts: List[DailyForecast]
+    series: Optional[ForecastSeries] = None # Full-resolution steps the days were built from
+
+@dataclass(slots=True)
+class CityReport:
+    """
+    Represents the combined current weather and forecast for a single city query.
+    Either part may be None if its request failed.
+    """
+    city: str # City name as queried
+    current: Optional[WeatherData]
+    forecast: Optional[ForecastData]
@@ -4,7 +4,8 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.box import ROUNDED
 from rich.columns import Columns
-from weather_data import WeatherData, ForecastData, DailyForecast
+from typing import Dict, Optional, Set, Tuple
+from weather_data import WeatherData, ForecastData, DailyForecast, CityReport
 
 class WeatherDisplay:
     """
@@ -26,6 +27,8 @@ class WeatherDisplay:
         "50d": "🌫️", "50n": "🌫️",
         "unknown": "❓" # Fallback for unknown icons
     }
+    # Columns of the --watch table, before the "Updated" column
+    WATCH_COLUMNS = ("City", "Temp", "Feels Like", "Conditions", "Humidity", "Wind", "Today")
 
     def __init__(self, console: Console):
         """
@@ -163,4 +166,69 @@ class WeatherDisplay:
         self.console.print(Text(" ".join(date_labels).center(chart_width + 2), style="dim"), justify="center")
         self.console.print(Text("Days".center(chart_width + 2), style="dim"), justify="center")
 
-        self.console.print("\n") # Add a newline for spacing
\ No newline at end of file
+        self.console.print("\n") # Add a newline for spacing
+
+    def watch_row(self, report: CityReport) -> Optional[Tuple[str, ...]]:
+        """
+        Formats the cells of a city's row in the watch table, one per WATCH_COLUMNS entry.
+        Args:
+            report (CityReport): The latest report for the city.
+        Returns:
+            Optional[Tuple[str, ...]]: The cell texts, or None if current weather is missing.
+        """
+        data = report.current
+        if data is None:
+            return None
+        today = report.forecast.daily_forecasts[0] if report.forecast and report.forecast.daily_forecasts else None
+        return (
+            f"{data.city}, {data.country}",
+            f"{data.temperature:.1f}°C {self._get_weather_emoji(data.icon)}",
+            f"{data.feels_like:.1f}°C",
+            data.description,
+            f"{data.humidity}%",
+            f"{data.wind_speed:.1f} m/s",
+            f"{today.min_temp:.0f}–{today.max_temp:.0f}°C" if today else "-",
+        )
+
+    def build_watch_table(
+        self,
+        rows: Dict[str, Optional[Tuple[str, ...]]],
+        changed: Dict[str, Set[int]],
+        updated: Dict[str, str],
+        interval: float,
+    ) -> Table:
+        """
+        Builds the table shown in watch mode, one row per watched city.
+        Cells whose value changed in the city's last refresh are highlighted.
+        Args:
+            rows (Dict[str, Optional[Tuple[str, ...]]]): Cells from watch_row, by queried city;
+                None for cities without data yet.
+            changed (Dict[str, Set[int]]): Indexes of the cells that changed in each city's last refresh.
+            updated (Dict[str, str]): Time of each city's last refresh, e.g. "14:05:10",
+                or a failure note.
+            interval (float): Refresh interval in seconds, shown in the caption.
+        Returns:
+            Table: The table to hand to rich.live.Live.
+        """
+        every = f"{interval / 60:g} min" if interval >= 60 else f"{interval:g} s"
+        table = Table(
+            title="[bold blue]PyWeather Watch[/bold blue]",
+            caption=f"Refreshing every {every} · Ctrl+C to quit",
+            header_style="bold green",
+            border_style="purple",
+            box=ROUNDED
+        )
+        for column in self.WATCH_COLUMNS:
+            table.add_column(column, style="yellow" if column != "City" else "cyan")
+        table.add_column("Updated", style="dim", justify="right")
+
+        for city, cells in rows.items():
+            if cells is None:
+                table.add_row(city, *["…"] * (len(self.WATCH_COLUMNS) - 1), updated.get(city, "pending"))
+                continue
+            highlighted = changed.get(city, set())
+            table.add_row(
+                *(Text(cell, style="bold reverse") if i in highlighted else cell for i, cell in enumerate(cells)),
+                updated.get(city, "")
+            )
+        return table
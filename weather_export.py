@@ -0,0 +1,240 @@
+import csv
+from abc import ABC, abstractmethod
+from dataclasses import fields
+from typing import Any, BinaryIO, Dict, List, TextIO, Tuple
+import weather_json
+from weather_data import WeatherData, DailyForecast, ForecastData, CityReport
+
+try:
+    import pyarrow as pa # Optional: enables the Parquet and Arrow sinks
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+_CURRENT_FIELDS = tuple(f.name for f in fields(WeatherData))
+_DAILY_FIELDS = tuple(f.name for f in fields(DailyForecast))
+
+# Flat, one-row-per-forecast-day layout shared by the CSV and columnar sinks.
+# Current conditions repeat on each of a city's rows; a city without a forecast gets one row.
+ROW_COLUMNS = (
+    ("query", "string"),
+    ("city", "string"),
+    ("country", "string"),
+    ("temperature", "float64"),
+    ("feels_like", "float64"),
+    ("humidity", "int64"),
+    ("description", "string"),
+    ("icon", "string"),
+    ("wind_speed", "float64"),
+    ("pressure", "int64"),
+    ("date", "string"),
+    ("min_temp", "float64"),
+    ("max_temp", "float64"),
+    ("avg_temp", "float64"),
+    ("forecast_description", "string"),
+    ("forecast_icon", "string"),
+)
+_NO_CURRENT = (None,) * len(_CURRENT_FIELDS)
+_NO_DAILY = (None,) * len(_DAILY_FIELDS)
+
+
+def report_rows(report: CityReport) -> List[Tuple[Any, ...]]:
+    """
+    Flattens a CityReport into rows matching ROW_COLUMNS, one per forecast day.
+    """
+    current = report.current
+    head = (report.city,) + (
+        tuple(getattr(current, name) for name in _CURRENT_FIELDS) if current else _NO_CURRENT
+    )
+    days = report.forecast.daily_forecasts if report.forecast else []
+    if not days:
+        return [head + _NO_DAILY]
+    return [head + tuple(getattr(day, name) for name in _DAILY_FIELDS) for day in days]
+
+
+def current_record(current: WeatherData) -> Dict[str, Any]:
+    """
+    Converts current conditions into a JSON-serializable dict.
+    """
+    return {name: getattr(current, name) for name in _CURRENT_FIELDS}
+
+
+def forecast_record(forecast: ForecastData) -> Dict[str, Any]:
+    """
+    Converts a forecast into a JSON-serializable dict. The full-resolution
+    series is left out; only the daily forecasts are included.
+    """
+    return {
+        "city": forecast.city,
+        "country": forecast.country,
+        "daily": [{name: getattr(day, name) for name in _DAILY_FIELDS} for day in forecast.daily_forecasts],
+    }
+
+
+def report_record(report: CityReport) -> Dict[str, Any]:
+    """
+    Converts a CityReport into a JSON-serializable dict; failed parts are null.
+    """
+    return {
+        "query": report.city,
+        "current": current_record(report.current) if report.current else None,
+        "forecast": forecast_record(report.forecast) if report.forecast else None,
+    }
+
+
+class ReportSink(ABC):
+    """
+    Base class for output sinks that write CityReports as they arrive.
+    Sinks are context managers; close() flushes buffered rows but never closes the
+    underlying stream, which belongs to the caller.
+    """
+    binary = False # True if the sink must be given a binary stream
+
+    @abstractmethod
+    def write(self, report: CityReport) -> None:
+        """
+        Writes one report.
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "ReportSink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class NDJSONSink(ReportSink):
+    """
+    Writes one JSON object per city report and line (newline-delimited JSON).
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def write(self, report: CityReport) -> None:
+        self.stream.write(weather_json.dumps(report_record(report)) + "\n")
+        self.stream.flush()
+
+
+class CSVSink(ReportSink):
+    """
+    Writes city reports as CSV rows in the ROW_COLUMNS layout, with a header line.
+    """
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self._writer = csv.writer(stream)
+        self._writer.writerow(name for name, _ in ROW_COLUMNS)
+
+    def write(self, report: CityReport) -> None:
+        self._writer.writerows(report_rows(report))
+        self.stream.flush()
+
+
+class _ColumnarSink(ReportSink):
+    """
+    Buffers rows column-wise and hands them to pyarrow in record batches,
+    so the per-report cost is appending a few values to lists.
+    """
+    binary = True
+    DEFAULT_BATCH_SIZE = 10_000 # Rows per record batch / Parquet row group
+
+    def __init__(self, stream: BinaryIO, batch_size: int = DEFAULT_BATCH_SIZE):
+        if pa is None:
+            raise ImportError(f"pyarrow is required for {type(self).__name__} (pip install pyarrow)")
+        self.stream = stream
+        self.batch_size = batch_size
+        self.schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in ROW_COLUMNS])
+        self._columns: List[List[Any]] = [[] for _ in ROW_COLUMNS]
+        self._buffered = 0
+
+    def write(self, report: CityReport) -> None:
+        for row in report_rows(report):
+            for column, value in zip(self._columns, row):
+                column.append(value)
+            self._buffered += 1
+        if self._buffered >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffered:
+            return
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(self._columns, self.schema)],
+            schema=self.schema,
+        )
+        self._write_batch(batch)
+        self._columns = [[] for _ in ROW_COLUMNS]
+        self._buffered = 0
+
+    @abstractmethod
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        """
+        Writes one record batch in the sink's format.
+        """
+
+
+class ParquetSink(_ColumnarSink):
+    """
+    Writes city reports to a Parquet file, one row group per batch of rows.
+    """
+
+    def __init__(self, stream: BinaryIO, batch_size: int = _ColumnarSink.DEFAULT_BATCH_SIZE):
+        super().__init__(stream, batch_size)
+        self._writer = pq.ParquetWriter(stream, self.schema)
+
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+class ArrowSink(_ColumnarSink):
+    """
+    Writes city reports as an Arrow IPC stream, which other tools can read
+    batch by batch while the export is still running.
+    """
+
+    def __init__(self, stream: BinaryIO, batch_size: int = _ColumnarSink.DEFAULT_BATCH_SIZE):
+        super().__init__(stream, batch_size)
+        self._writer = pa.ipc.new_stream(stream, self.schema)
+
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        self._writer.write_batch(batch)
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+SINKS = {
+    "ndjson": NDJSONSink,
+    "csv": CSVSink,
+    "parquet": ParquetSink,
+    "arrow": ArrowSink,
+}
+
+
+def open_sink(format_name: str, stream: Any) -> ReportSink:
+    """
+    Creates the output sink for a format name.
+    Args:
+        format_name (str): One of the keys of SINKS.
+        stream (Any): A text stream for ndjson/csv, a binary stream for parquet/arrow.
+    Returns:
+        ReportSink: The sink, ready to write.
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If the format needs pyarrow and it is not installed.
+    """
+    try:
+        sink_class = SINKS[format_name]
+    except KeyError:
+        raise ValueError(f"Unknown output format '{format_name}' (choose from {', '.join(SINKS)})") from None
+    return sink_class(stream)
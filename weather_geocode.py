@@ -0,0 +1,137 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, TYPE_CHECKING
+import weather_json
+
+if TYPE_CHECKING:
+    from city_index import CityIndex
+
+
+def normalize_city_name(name: str) -> str:
+    """
+    Normalizes a user-typed city name so spelling variants share one lookup key.
+    "  New  York ,US" and "new york, us" both become "new york,us".
+    """
+    name = re.sub(r"\s+", " ", name.strip().casefold())
+    return re.sub(r"\s*,\s*", ",", name)
+
+
+@dataclass(slots=True, frozen=True)
+class Location:
+    """
+    Represents a resolved city: its canonical name, coordinates and, when known,
+    its OpenWeatherMap city ID.
+    """
+    name: str
+    country: str
+    lat: float
+    lon: float
+    city_id: Optional[int] = None
+
+    def to_params(self) -> Dict[str, Any]:
+        """
+        Returns query parameters that identify this location unambiguously.
+        The city ID is preferred; coordinates are rounded so the cache key is stable.
+        """
+        if self.city_id is not None:
+            return {"id": self.city_id}
+        return {"lat": round(self.lat, 4), "lon": round(self.lon, 4)}
+
+
+class CityResolver:
+    """
+    Maps normalized city names to Locations, cached in memory and optionally on disk
+    as a JSON file, so each name only needs to be geocoded once. An offline CityIndex
+    can answer unambiguous names without any geocoding request.
+    New names are written to disk in batches by flush(), not one file rewrite per name.
+    """
+    SAVE_INTERVAL = 30.0 # Seconds after a save before flush_due() asks for the next one
+
+    def __init__(self, path: Optional[str] = None, index: Optional["CityIndex"] = None):
+        """
+        Initializes the resolver, loading previously resolved names from disk.
+        Args:
+            path (Optional[str]): JSON file to persist resolved names in. When omitted
+                the resolver only caches in memory.
+            index (Optional[CityIndex]): Offline city index consulted for names that
+                have not been resolved yet.
+        """
+        self.path = path
+        self.index = index
+        self._locations: Dict[str, Location] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock() # Serializes flushes so an older snapshot never lands last
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    stored = weather_json.loads(f.read())
+                self._locations = {key: Location(**value) for key, value in stored.items()}
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Ignoring unreadable geocoding cache {path}: {e}")
+
+    def lookup(self, city_name: str) -> Optional[Location]:
+        """
+        Returns the cached Location for a city name, or None if it has not been resolved.
+        Names missing from the cache are looked up in the offline index, if any, and
+        used when exactly one city matches.
+        """
+        location = self._locations.get(normalize_city_name(city_name))
+        if location is None and self.index is not None:
+            matches = self.index.get(city_name)
+            if len(matches) == 1:
+                location = matches[0]
+        return location
+
+    def store(self, city_name: str, location: Location) -> None:
+        """
+        Caches the Location for a city name. It reaches the disk with the next flush().
+        """
+        with self._lock:
+            self._locations[normalize_city_name(city_name)] = location
+            self._dirty = bool(self.path)
+
+    def flush_due(self) -> bool:
+        """
+        Returns True if there are unsaved names and SAVE_INTERVAL has passed since the last save.
+        """
+        return self._dirty and time.monotonic() - self._saved_at >= self.SAVE_INTERVAL
+
+    def flush(self) -> None:
+        """
+        Writes the cache to disk if names were added since the last save.
+        Blocks on file I/O; async callers should run it in a worker thread.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                locations = dict(self._locations)
+                self._dirty = False
+                self._saved_at = time.monotonic()
+            self._save(locations)
+
+    def _save(self, locations: Dict[str, Location]) -> None:
+        """
+        Writes a snapshot of the cache to disk atomically, so concurrent readers never see a partial file.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        data = weather_json.dumps({key: asdict(location) for key, location in locations.items()})
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".geocode-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not save geocoding cache {self.path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __len__(self) -> int:
+        return len(self._locations)
@@ -0,0 +1,78 @@
+import json
+from typing import Any, Dict, Union
+from weather_data import WeatherData
+
+# Optional fast decoders; the standard library is used when neither is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decodes a JSON document with the fastest available backend.
+    Args:
+        data (Union[bytes, str]): The raw JSON, e.g. an HTTP response body.
+    Returns:
+        Any: The decoded value.
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """
+    Encodes a value as compact JSON text with the fastest available backend.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    if msgspec is not None:
+        return msgspec.json.encode(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def parse_current_weather(data: Dict[str, Any]) -> WeatherData:
+    """
+    Builds a WeatherData object from a decoded "weather" endpoint response.
+    Args:
+        data (Dict[str, Any]): The decoded JSON response.
+    Returns:
+        WeatherData: The current conditions.
+    Raises:
+        KeyError: If the response is missing a required field.
+    """
+    main = data['main']
+    condition = data['weather'][0]
+    return WeatherData(
+        city=data['name'],
+        country=data['sys']['country'],
+        temperature=main['temp'],
+        feels_like=main['feels_like'],
+        humidity=main['humidity'],
+        description=condition['description'].capitalize(),
+        icon=condition['icon'],
+        wind_speed=data['wind']['speed'],
+        pressure=main['pressure']
+    )
+
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously at a fixed rate.
+    Each acquired token allows one request.
+    """
+
+    def __init__(self, capacity: float, period: float):
+        """
+        Initializes a full bucket.
+        Args:
+            capacity (float): Maximum number of tokens (the allowed burst).
+            period (float): Seconds it takes to refill the bucket from empty.
+        """
+        if capacity <= 0 or period <= 0:
+            raise ValueError("capacity and period must be positive")
+        self.capacity = capacity
+        self.rate = capacity / period # Tokens per second
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def delay_until_available(self, now: Optional[float] = None) -> float:
+        """
+        Returns how many seconds to wait before a token is available (0 if one is available now).
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def available(self, now: Optional[float] = None) -> float:
+        """
+        Returns the number of tokens that could be taken right now.
+        """
+        self._refill(time.monotonic() if now is None else now)
+        return self._tokens
+
+    def take(self) -> None:
+        """
+        Consumes one token. Call only after delay_until_available() returned 0.
+        """
+        self._tokens -= 1
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter matching OpenWeatherMap plan quotas.
+    Callers wait in FIFO order for a slot instead of being rejected with HTTP 429.
+    """
+    # Free-tier plan limits
+    FREE_CALLS_PER_MINUTE = 60
+    FREE_CALLS_PER_DAY = 1000
+
+    def __init__(self, calls_per_minute: Optional[int] = FREE_CALLS_PER_MINUTE, calls_per_day: Optional[int] = None):
+        """
+        Initializes the limiter.
+        Args:
+            calls_per_minute (Optional[int]): Allowed calls per minute, or None for no per-minute limit.
+            calls_per_day (Optional[int]): Allowed calls per day, or None for no daily limit.
+        """
+        self._buckets = []
+        if calls_per_minute:
+            self._buckets.append(TokenBucket(calls_per_minute, 60))
+        if calls_per_day:
+            self._buckets.append(TokenBucket(calls_per_day, 24 * 60 * 60))
+        # Serializes waiters so requests are released in arrival order
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Waits until a request may be sent under every configured limit, then reserves it.
+        """
+        async with self._lock:
+            while True:
+                delay = max((bucket.delay_until_available() for bucket in self._buckets), default=0.0)
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            for bucket in self._buckets:
+                bucket.take()
+
+    def headroom(self) -> float:
+        """
+        Returns how many requests could be sent right now without waiting
+        (0 while other callers are queued, infinity when no limit is configured).
+        Lets optional work such as prefetching back off before it delays real requests.
+        """
+        if self._lock.locked():
+            return 0.0
+        now = time.monotonic()
+        return min((bucket.available(now) for bucket in self._buckets), default=float("inf"))
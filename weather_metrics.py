@@ -0,0 +1,22 @@
+from dataclasses import dataclass, asdict
+from typing import Dict
+
+
+@dataclass
+class APIMetrics:
+    """
+    Counters describing how WeatherAPI requests were served.
+    """
+    requests: int = 0 # HTTP attempts sent upstream, including retries
+    cache_hits: int = 0 # Calls answered from the response cache
+    coalesced: int = 0 # Calls that joined an identical in-flight request
+    retries: int = 0 # Attempts repeated after a transient failure
+    failures: int = 0 # Calls that returned no data after all attempts
+    short_circuited: int = 0 # Calls rejected by an open circuit breaker
+    stale_served: int = 0 # Calls answered with expired cache data
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Returns the counters as a plain dictionary, e.g. for logging or JSON output.
+        """
+        return asdict(self)
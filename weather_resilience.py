@@ -0,0 +1,156 @@
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Optional, FrozenSet
+
+import httpx
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Describes how WeatherAPI retries transient failures: network errors and
+    retryable HTTP status codes are retried with exponential backoff and jitter.
+    """
+    max_attempts: int = 3 # Total attempts, including the first; 1 disables retries
+    backoff_base: float = 0.5 # Seconds to wait before the first retry
+    backoff_max: float = 30.0 # Upper bound for any single wait
+    jitter: float = 1.0 # Fraction of each backoff that is randomized (0 = none, 1 = full jitter)
+    retryable_statuses: FrozenSet[int] = field(default_factory=lambda: frozenset({429, 500, 502, 503, 504}))
+    respect_retry_after: bool = True # Honor the server's Retry-After header when present
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0 <= self.jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        """
+        Returns True if a response with this status code should be retried.
+        """
+        return status_code in self.retryable_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns the wait before the next attempt, given the number of attempts made so far.
+        Args:
+            attempt (int): Attempts already made (1 after the first failure).
+        Returns:
+            float: Seconds to wait.
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * (1 - self.jitter) + random.uniform(0, delay * self.jitter)
+
+    def retry_after(self, response: Optional[httpx.Response]) -> Optional[float]:
+        """
+        Parses the Retry-After header of a response, in seconds or as an HTTP date.
+        Args:
+            response (Optional[httpx.Response]): The failed response, if there was one.
+        Returns:
+            Optional[float]: Seconds to wait, or None if there is no usable header.
+        """
+        if response is None or not self.respect_retry_after:
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def delay_for(self, attempt: int, response: Optional[httpx.Response] = None) -> Optional[float]:
+        """
+        Returns the wait before the next attempt, preferring the server's Retry-After.
+        Args:
+            attempt (int): Attempts already made.
+            response (Optional[httpx.Response]): The failed response, if there was one.
+        Returns:
+            Optional[float]: Seconds to wait, or None if the server's Retry-After exceeds
+                backoff_max; retrying any sooner would only be rejected again.
+        """
+        retry_after = self.retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.backoff_max else None
+        return self.backoff(attempt)
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream endpoint is unhealthy.
+    The breaker opens after `failure_threshold` consecutive failures and rejects calls
+    until `reset_timeout` has passed. It then half-opens and lets a limited number of
+    probe requests through: a successful probe closes it, a failed one reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, half_open_max_calls: int = 1):
+        """
+        Initializes a closed breaker.
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout (float): Seconds to stay open before allowing probe requests.
+            half_open_max_calls (int): Probe requests allowed at once while half-open.
+        """
+        if failure_threshold < 1 or half_open_max_calls < 1:
+            raise ValueError("failure_threshold and half_open_max_calls must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._last_probe_at = 0.0
+
+    def allow_request(self) -> bool:
+        """
+        Returns True if a request may be sent now, reserving a probe slot when half-open.
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        if self.state == self.HALF_OPEN:
+            now = time.monotonic()
+            # A probe that never reported back (e.g. was cancelled) must not block forever
+            if self._probes_in_flight >= self.half_open_max_calls and now - self._last_probe_at < self.reset_timeout:
+                return False
+            if self._probes_in_flight >= self.half_open_max_calls:
+                self._probes_in_flight = 0
+            self._probes_in_flight += 1
+            self._last_probe_at = now
+        return True
+
+    def record_success(self) -> None:
+        """
+        Records a healthy response and closes the breaker.
+        """
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._probes_in_flight = 0
+
+    def record_failure(self) -> bool:
+        """
+        Records a failed request.
+        Returns:
+            bool: True if this failure opened the breaker.
+        """
+        self._consecutive_failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._consecutive_failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probes_in_flight = 0
+            return True
+        return False
@@ -0,0 +1,258 @@
+"""
+A small HTTP/1.1 gateway in front of one WeatherAPI, so many local clients share
+its connection pool, cache, rate limiter and request coalescing instead of each
+calling OpenWeatherMap directly.
+
+Endpoints (JSON responses):
+    /current?city=London          current conditions
+    /forecast?city=London         daily forecasts
+    /batch?city=London&city=Tokyo reports for several cities, streamed as NDJSON
+                                  in completion order (POST a JSON list of names
+                                  or {"cities": [...]} for long lists)
+    /metrics                      the client's APIMetrics counters
+
+Unknown cities are answered with 404; network errors and upstream failures with 502.
+
+Run it with:
+    python main.py --serve 127.0.0.1:8080
+"""
+import asyncio
+from http import HTTPStatus
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+import weather_json
+from weather_api import WeatherAPI
+from weather_export import current_record, forecast_record, report_record
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+MAX_BATCH_CITIES = 1000
+KEEPALIVE_TIMEOUT = 30.0 # Seconds an idle client connection is kept open
+
+
+class HTTPError(Exception):
+    """
+    Raised by request handlers to answer with an error status and message.
+    """
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request(NamedTuple):
+    """
+    A parsed HTTP request.
+    """
+    method: str
+    path: str
+    query: Dict[str, List[str]]
+    headers: Dict[str, str] # Lower-case names
+    body: bytes
+    version: str # "HTTP/1.0" or "HTTP/1.1"
+
+    @property
+    def keep_alive(self) -> bool:
+        """
+        True if the connection stays open after this request: by default for HTTP/1.1,
+        and only when asked for with HTTP/1.0.
+        """
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+
+class WeatherServer:
+    """
+    Serves weather data from a shared WeatherAPI over plain HTTP, using only asyncio streams.
+    """
+
+    def __init__(self, weather_api: WeatherAPI, batch_concurrency: int = WeatherAPI.DEFAULT_CONCURRENCY):
+        """
+        Initializes the server.
+        Args:
+            weather_api (WeatherAPI): The client shared by every request.
+            batch_concurrency (int): Cities fetched at once for each /batch request.
+        """
+        self.weather_api = weather_api
+        self.batch_concurrency = batch_concurrency
+        self._routes = {
+            "/current": self._current,
+            "/forecast": self._forecast,
+            "/batch": self._batch,
+            "/metrics": self._metrics,
+        }
+        self._responding: Set[asyncio.StreamWriter] = set() # Connections whose response head was sent
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """
+        Listens on host:port and serves requests until cancelled.
+        """
+        server = await asyncio.start_server(self._handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEPALIVE_TIMEOUT)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive=False)
+                    return
+                if request is None:
+                    return # Client closed the connection or went idle
+                keep_alive = request.keep_alive
+                if request.version == "HTTP/1.0" and request.path.rstrip("/") == "/batch":
+                    keep_alive = False # The streamed body is delimited by closing the connection
+                try:
+                    await self._dispatch(writer, request, keep_alive)
+                except HTTPError as e:
+                    await self._send_error(writer, e, keep_alive)
+                except Exception as e:
+                    print(f"Error handling {request.method} {request.path}: {e!r}")
+                    if writer not in self._responding:
+                        await self._send_error(writer, HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "Internal server error"), keep_alive=False)
+                    return # A half-sent response can't be recovered; drop the connection
+                finally:
+                    self._responding.discard(writer)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._responding.discard(writer)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Request]:
+        """
+        Reads one request. Returns None at end of stream.
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Request headers too large") from None
+
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+        version = version.strip().upper()
+        if version not in ("HTTP/1.0", "HTTP/1.1"):
+            raise HTTPError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, f"Unsupported protocol {version}")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+
+        url = urlsplit(target)
+        return Request(method.upper(), url.path, parse_qs(url.query), headers, body, version)
+
+    async def _dispatch(self, writer: asyncio.StreamWriter, request: Request, keep_alive: bool) -> None:
+        handler = self._routes.get(request.path.rstrip("/") or "/")
+        if handler is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No such endpoint: {request.path}")
+        allowed = ("GET", "POST") if handler == self._batch else ("GET",)
+        if request.method not in allowed:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{request.method} is not supported for {request.path}")
+        await handler(writer, request, keep_alive)
+
+    @staticmethod
+    def _city_param(query: Dict[str, List[str]]) -> str:
+        city = query.get("city", [""])[0].strip()
+        if not city:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Missing 'city' query parameter")
+        return city
+
+    def _upstream_error(self, what: str, city: str) -> HTTPError:
+        """
+        Builds the error for a failed upstream lookup. Answers the client's mistakes with
+        the matching 4xx status; network errors and upstream failures become 502.
+        """
+        status = self.weather_api.last_error_status()
+        if status == HTTPStatus.NOT_FOUND:
+            return HTTPError(HTTPStatus.NOT_FOUND, f"Unknown city: {city}")
+        if status == HTTPStatus.BAD_REQUEST:
+            return HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid city: {city}")
+        if status == HTTPStatus.TOO_MANY_REQUESTS:
+            return HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Upstream quota exhausted, try again later")
+        return HTTPError(HTTPStatus.BAD_GATEWAY, f"Could not retrieve {what} for {city}")
+
+    async def _current(self, writer, request, keep_alive) -> None:
+        city = self._city_param(request.query)
+        current = await self.weather_api.get_current_weather(city)
+        if current is None:
+            raise self._upstream_error("current weather", city)
+        await self._send_json(writer, current_record(current), keep_alive)
+
+    async def _forecast(self, writer, request, keep_alive) -> None:
+        city = self._city_param(request.query)
+        forecast = await self.weather_api.get_five_day_forecast(city)
+        if forecast is None:
+            raise self._upstream_error("forecast", city)
+        await self._send_json(writer, forecast_record(forecast), keep_alive)
+
+    async def _metrics(self, writer, request, keep_alive) -> None:
+        await self._send_json(writer, self.weather_api.metrics.as_dict(), keep_alive)
+
+    async def _batch(self, writer, request, keep_alive) -> None:
+        cities = [city.strip() for city in request.query.get("city", []) if city.strip()]
+        if request.body:
+            try:
+                payload = weather_json.loads(request.body)
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON") from None
+            if isinstance(payload, dict):
+                payload = payload.get("cities")
+            if not isinstance(payload, list) or not all(isinstance(city, str) for city in payload):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'Body must be a list of city names or {"cities": [...]}')
+            cities.extend(city.strip() for city in payload if city.strip())
+        if not cities:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No cities given")
+        if len(cities) > MAX_BATCH_CITIES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"At most {MAX_BATCH_CITIES} cities per batch")
+
+        # Stream one line per city as it completes. HTTP/1.1 uses chunked transfer encoding;
+        # HTTP/1.0 has none, so the body there ends when handle_connection closes the connection.
+        chunked = request.version == "HTTP/1.1"
+        self._write_head(writer, HTTPStatus.OK, "application/x-ndjson", keep_alive,
+                         {"Transfer-Encoding": "chunked"} if chunked else None)
+        async for report in self.weather_api.get_many(cities, concurrency=self.batch_concurrency):
+            line = (weather_json.dumps(report_record(report)) + "\n").encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line) if chunked else line)
+            await writer.drain()
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+
+    def _write_head(self, writer: asyncio.StreamWriter, status: HTTPStatus, content_type: str,
+                    keep_alive: bool, extra_headers: Optional[Dict[str, str]] = None) -> None:
+        self._responding.add(writer)
+        headers = {"Content-Type": content_type, "Connection": "keep-alive" if keep_alive else "close"}
+        headers.update(extra_headers or {})
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"] + [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer: asyncio.StreamWriter, payload: Any, keep_alive: bool,
+                         status: HTTPStatus = HTTPStatus.OK) -> None:
+        body = weather_json.dumps(payload).encode("utf-8")
+        self._write_head(writer, status, "application/json", keep_alive, {"Content-Length": str(len(body))})
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_error(self, writer: asyncio.StreamWriter, error: HTTPError, keep_alive: bool) -> None:
+        await self._send_json(writer, {"error": error.message}, keep_alive, status=error.status)